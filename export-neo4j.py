@@ -1,11 +1,182 @@
+import argparse
 import os
+import sys
+import time
+from pathlib import Path
 
 import dotenv
 import pyodbc
-from py2neo import Graph
 from py2neo.bulk import create_nodes, create_relationships
 from py2neo.data import Node
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+from neo4j_export.admin_import import AdminImportExport
+from neo4j_export.backends import BACKENDS
+from neo4j_export.batching import AdaptiveBatcher, DeadLetterFile, retrying, write_with_split
+from neo4j_export.checkpoint import CheckpointStore, keyset_batches, replace_replayed, skip_replayed
+from neo4j_export.columnar import columnar_batches
+from neo4j_export.dedupe import collapse_duplicates
+from neo4j_export.degrees import DegreeCounter
+from neo4j_export.delta import NodeTable, SnapshotStore, sync_nodes, sync_relationships
+from neo4j_export.endpoints import EndpointFilter, OrphanReport
+from neo4j_export.extract import key_ranges, read_ranges
+from neo4j_export.fanout import FanOut, describe_target, open_target, parse_target
+from neo4j_export.idcache import NodeIdCache, split_resolved
+from neo4j_export.keys import compact_node_rows, compact_relationship_rows
+from neo4j_export.load_csv import LoadCsvLoader, serve_directory
+from neo4j_export.metrics import RunMetrics, timed
+from neo4j_export.partition import write_partitioned
+from neo4j_export.pipeline import fetch_batches, run_pipeline
+from neo4j_export.schema import NODE_KEYS, constraint_query, provision_schema, wait_for_indexes
+from neo4j_export.sinks import SINKS
+from neo4j_export.stages import StageScheduler, serialized
+from neo4j_export.subset import Subset, and_where, parse_years
+from neo4j_export.transform import ARTIST_KEYS, FILM_KEYS, node_params, relationship_params
+from neo4j_export.truncate import recreate_database, truncate_graph
+from neo4j_export.verify import GraphVerifier
+
+parser = argparse.ArgumentParser(description="Export des données IMDB de SQL Server vers Neo4j")
+parser.add_argument("--pipeline", action="store_true",
+                    help="lire les lots SQL dans un thread dédié pendant l'écriture dans Neo4j")
+parser.add_argument("--writers", type=int, default=1,
+                    help="nombre de threads écrivains Neo4j en mode --pipeline")
+parser.add_argument("--queue-size", type=int, default=2,
+                    help="nombre maximal de lots en attente entre lecture et écriture")
+parser.add_argument("--rel-writers", type=int, default=1,
+                    help="nombre de sessions Neo4j concurrentes pour créer les relations")
+parser.add_argument("--sql-readers", type=int, default=1,
+                    help="nombre de connexions SQL lisant chaque table en parallèle, par plages de clés")
+parser.add_argument("--checkpoint", metavar="STATE_FILE",
+                    help="export reprenable : pagination par clé et progression enregistrée dans STATE_FILE")
+parser.add_argument("--sync", metavar="SNAPSHOT_FILE",
+                    help="synchronisation incrémentale : n'applique que les changements depuis l'instantané SNAPSHOT_FILE")
+parser.add_argument("--admin-import", metavar="DIR",
+                    help="export hors ligne : écrit dans DIR les CSV pour neo4j-admin database import")
+parser.add_argument("--csv-rows-per-file", type=int, default=1000000,
+                    help="nombre de lignes par morceau CSV (0 = un seul fichier)")
+parser.add_argument("--compress", action="store_true", help="compresser les morceaux CSV en gzip")
+parser.add_argument("--load-csv", metavar="DIR",
+                    help="chargement par LOAD CSV : les lots sont écrits dans DIR, lisible par le serveur Neo4j")
+parser.add_argument("--load-csv-url", default="file:///",
+                    help="URL de DIR vue par le serveur Neo4j (défaut: dossier d'import du serveur)")
+parser.add_argument("--load-csv-serve", type=int, metavar="PORT",
+                    help="servir DIR en HTTP sur PORT (utiliser avec --load-csv-url http://<hôte>:PORT/)")
+parser.add_argument("--truncate-batch", type=int, default=10000,
+                    help="nombre maximal de relations ou nœuds supprimés par transaction lors du vidage")
+parser.add_argument("--recreate-database", metavar="NAME",
+                    help="vider le graphe en recréant la base NAME (Enterprise) au lieu de supprimer par lots")
+parser.add_argument("--adaptive-batches", action="store_true",
+                    help="ajuster la taille des lots selon la latence des validations et couper en deux les lots en échec")
+parser.add_argument("--target-latency", type=float, default=2.0,
+                    help="durée visée d'une validation en mode --adaptive-batches, en secondes")
+parser.add_argument("--dead-letter", default="export-dead-letter.jsonl",
+                    help="fichier recevant les lignes impossibles à écrire en mode --adaptive-batches")
+parser.add_argument("--fast-path", action="store_true",
+                    help="envoyer les lignes SQL directement en listes de valeurs, sans construire d'objets Node")
+parser.add_argument("--backend", choices=sorted(BACKENDS), default="py2neo",
+                    help="bibliothèque d'écriture dans Neo4j (driver = driver officiel neo4j, implique --fast-path)")
+parser.add_argument("--id-cache", action="store_true",
+                    help="garder les elementId des nœuds créés et créer les relations par identifiant interne (implique --fast-path)")
+parser.add_argument("--id-cache-memory", type=int, default=5000000,
+                    help="nombre d'identifiants gardés en mémoire avant déversement sur disque")
+parser.add_argument("--id-cache-file", help="fichier SQLite de déversement du cache (temporaire par défaut)")
+parser.add_argument("--collapse-duplicates", action="store_true",
+                    help="une seule relation par (artiste, catégorie, film), avec une propriété count (implique --fast-path)")
+parser.add_argument("--collapse-memory", type=int, default=1000000,
+                    help="nombre de triplets distincts gardés en mémoire avant tri externe sur disque")
+parser.add_argument("--skip-orphans", action="store_true",
+                    help="ne pas envoyer les relations dont l'artiste ou le film n'a pas été exporté")
+parser.add_argument("--orphan-report", default="orphans.csv",
+                    help="fichier CSV des relations écartées par --skip-orphans")
+parser.add_argument("--compact-keys", action="store_true",
+                    help="clés idFilm/idArtist entières (tt0001234 -> 1234) et propriétés nulles ou à 0 omises")
+parser.add_argument("--schema-timeout", type=float, default=600,
+                    help="délai maximal (s) d'attente des index ONLINE avant de charger")
+parser.add_argument("--parallel-stages", type=int, default=1,
+                    help="nombre d'étapes indépendantes exécutées en même temps (Films/Artists, catégories de relations)")
+parser.add_argument("--report", default="export-report.json",
+                    help="rapport JSON de l'exécution : temps de lecture, préparation et écriture, débit, latences par table")
+parser.add_argument("--prometheus", metavar="FILE",
+                    help="écrire aussi les mesures au format textfile de Prometheus (ex. pour node_exporter)")
+parser.add_argument("--sink", choices=["neo4j"] + sorted(SINKS), default="neo4j",
+                    help="destination : Neo4j, null (compte lignes et octets sans écrire), ndjson ou record (en mémoire)")
+parser.add_argument("--sink-file", default="export.ndjson", help="fichier de sortie de --sink ndjson, dossier pour csv et parquet")
+parser.add_argument("--columnar", action="store_true",
+                    help="lots convertis en colonnes NumPy (catégories codées par dictionnaire) ; "
+                         "plus lent que --fast-path, les colonnes redeviennent des listes Python pour Neo4j")
+parser.add_argument("--fanout", metavar="TYPE:EMPLACEMENT", action="append",
+                    help="destination alimentée par la même lecture SQL, à répéter : py2neo:bolt://hôte:7687, "
+                         "driver:neo4j://utilisateur:motdepasse@hôte, ndjson:FICHIER, csv:DOSSIER, parquet:DOSSIER, null:")
+parser.add_argument("--fanout-writers", type=int, default=1,
+                    help="threads écrivains par destination --fanout")
+parser.add_argument("--fanout-buffer", type=int, default=4,
+                    help="nombre maximal de lots en attente par destination --fanout avant de ralentir la lecture")
+parser.add_argument("--subset-years", metavar="DÉBUT:FIN",
+                    help="sous-ensemble : films sortis entre ces années (bornes incluses, ex. 1990:2000, 2010:)")
+parser.add_argument("--subset-sample", type=float, metavar="POURCENT",
+                    help="sous-ensemble : échantillon déterministe de POURCENT %% des films")
+parser.add_argument("--subset-seed", type=int, default=0, help="graine de --subset-sample")
+parser.add_argument("--subset-categories", metavar="CAT1,CAT2",
+                    help="sous-ensemble : catégories de crédits exportées (ex. 'acted in,directed')")
+parser.add_argument("--subset-films", metavar="CONDITION_SQL",
+                    help="sous-ensemble : condition SQL libre sur TFilm (ex. \"primaryTitle LIKE 'Star%%'\")")
+parser.add_argument("--degree-properties", action="store_true",
+                    help="calculer pendant l'export de tJob actorCount, filmCount, categoryMask... et les poser sur les nœuds, avec index")
+parser.add_argument("--degree-memory", type=int, default=1000000,
+                    help="nombre de couples (artiste, film) gardés en mémoire par --degree-properties avant tri externe sur disque")
+parser.add_argument("--verify", action="store_true",
+                    help="après l'export, comparer SQL Server et Neo4j par agrégats par tranche de clés")
+parser.add_argument("--verify-only", action="store_true", help="vérifier le graphe existant sans exporter")
+parser.add_argument("--verify-buckets", type=int, default=1024, help="nombre de tranches de clés par label à comparer")
+parser.add_argument("--verify-report", default="verify-diff.csv",
+                    help="fichier CSV des différences trouvées dans les tranches qui ne concordent pas")
+args = parser.parse_args()
+
+if args.checkpoint and args.sql_readers > 1:
+    parser.error("--checkpoint lit chaque table dans l'ordre des clés, incompatible avec --sql-readers")
+if args.checkpoint and args.collapse_duplicates:
+    parser.error("--collapse-duplicates lit tout tJob avant d'écrire, incompatible avec --checkpoint")
+if args.checkpoint and args.skip_orphans:
+    parser.error("--skip-orphans doit voir passer tous les nœuds, incompatible avec --checkpoint")
+if args.sync and args.compact_keys:
+    parser.error("--sync compare les identifiants IMDB d'origine, incompatible avec --compact-keys")
+if args.sync and args.collapse_duplicates:
+    # La synchronisation crée une relation par ligne de tJob, pas une relation pondérée par count
+    parser.error("--sync compte les relations parallèles, incompatible avec --collapse-duplicates")
+if args.checkpoint and args.admin_import:
+    parser.error("--admin-import réécrit tous les fichiers CSV, incompatible avec --checkpoint")
+if args.adaptive_batches and (args.rel_writers > 1 or args.load_csv):
+    # Un lot coupé en deux est réécrit en entier : une partie déjà validée créerait des relations en double
+    parser.error("--adaptive-batches réessaie des lots écrits en une seule transaction, incompatible avec --rel-writers et --load-csv")
+try:
+    # Films, crédits de ces films et artistes cités : le filtrage est fait par SQL Server
+    subset = Subset(parse_years(args.subset_years) if args.subset_years else None,
+                    [c.strip() for c in args.subset_categories.split(",")] if args.subset_categories else None,
+                    args.subset_sample, args.subset_seed, args.subset_films)
+except ValueError as error:
+    parser.error(f"subset: {error}")
+if subset.active and args.sync:
+    parser.error("--sync supprimerait tout ce qui est hors du sous-ensemble, incompatible avec --subset-*")
+if args.degree_properties and (args.checkpoint or args.admin_import or args.sync):
+    parser.error("--degree-properties doit voir passer toutes les relations, incompatible avec --checkpoint, --admin-import et --sync")
+if (args.verify or args.verify_only) and (args.admin_import or args.sink != "neo4j"):
+    parser.error("--verify interroge Neo4j, incompatible avec --admin-import et --sink")
+if args.fanout:
+    for spec in args.fanout:
+        try:
+            parse_target(spec)
+        except ValueError as error:
+            parser.error(f"--fanout {spec}: {error}")
+    # Un lot est rendu dès qu'il est déposé dans les files : rien ne peut dépendre de son écriture
+    for option in ("checkpoint", "adaptive_batches", "id_cache", "load_csv", "admin_import", "sync"):
+        if getattr(args, option):
+            parser.error(f"--fanout écrit en arrière-plan, incompatible avec --{option.replace('_', '-')}")
+    if args.sink != "neo4j":
+        parser.error("--sink et --fanout s'excluent : ajouter la destination avec --fanout")
+    if args.rel_writers > 1:
+        parser.error("--fanout écrit les relations d'une destination Neo4j une à la fois, incompatible avec --rel-writers")
+
 dotenv.load_dotenv(override=True)
 
 server = os.environ["TPBDD_SERVER"]
@@ -18,101 +189,481 @@ neo4j_server = os.environ["TPBDD_NEO4J_SERVER"]
 neo4j_user = os.environ["TPBDD_NEO4J_USER"]
 neo4j_password = os.environ["TPBDD_NEO4J_PASSWORD"]
 
-graph = Graph(neo4j_server, auth=(neo4j_user, neo4j_password))
+# Le mode hors ligne n'a pas besoin de connexion Neo4j
+fanout = None
+if args.admin_import:
+    backend = None
+elif args.fanout:
+    # Chaque destination a sa file et ses écrivains ; backend reste None
+    fanout = FanOut({describe_target(spec): open_target(spec, neo4j_server, (neo4j_user, neo4j_password))
+                     for spec in args.fanout}, args.fanout_writers, args.fanout_buffer)
+    backend = None
+elif args.sink != "neo4j":
+    # Même interface qu'un backend : l'export s'exécute entièrement, sans serveur Neo4j
+    backend = SINKS[args.sink](args.sink_file)
+else:
+    backend = BACKENDS[args.backend](neo4j_server, (neo4j_user, neo4j_password))
+graph = getattr(backend, "graph", None)
 
 BATCH_SIZE = 10000
 
-print("Deleting existing nodes and relationships...")
-graph.run("MATCH ()-[r]->() DELETE r")
-graph.run("MATCH (n:Artist) DETACH DELETE n")
-graph.run("MATCH (n:Film) DETACH DELETE n")
-
-with pyodbc.connect('DRIVER='+driver+';SERVER=tcp:'+server+';PORT=1433;DATABASE='+database+';UID='+username+';PWD='+ password) as conn:
-    cursor = conn.cursor()
-
-    # Films
-    exportedCount = 0
-    cursor.execute("SELECT COUNT(1) FROM TFilm")
-    totalCount = cursor.fetchval()
-    cursor.execute("SELECT idFilm, primaryTitle, startYear FROM TFilm")
-    while True:
-        importData = []
-        rows = cursor.fetchmany(BATCH_SIZE)
-        if not rows:
-            break
-
-        i = 0
-        for row in rows:
-            # Créer un objet Node avec comme label Film et les propriétés adéquates
-            n = Node("Film", idFilm=row[0], primaryTitle=row[1], startYear=row[2])
-            importData.append(n)
-            i += 1
 
-        try:
-            create_nodes(graph.auto(), importData, labels={"Film"})
-            exportedCount += len(rows)
-            print(f"{exportedCount}/{totalCount} title records exported to Neo4j")
-        except Exception as error:
-            print(error)
-
-    # Names
-    # En vous basant sur ce qui a été fait dans la section précédente, exportez les données de la table tArtist
-    exportedCount = 0
-    cursor.execute("SELECT COUNT(1) FROM tArtist")
-    totalCount = cursor.fetchval()
-    cursor.execute("SELECT idArtist, primaryName, birthYear FROM tArtist")
-    while True:
-        importData = []
-        rows = cursor.fetchmany(BATCH_SIZE)
-        if not rows:
-            break
-
-        for row in rows:
-            # Créer un objet Node avec comme label Artist et les propriétés adéquates
-            n = Node("Artist", idArtist=row[0], primaryName=row[1], birthYear=row[2])
-            importData.append(n)
+def connect_sql():
+    return pyodbc.connect('DRIVER='+driver+';SERVER=tcp:'+server+';PORT=1433;DATABASE='+database+';UID='+username+';PWD='+ password)
+
+
+def export_table(cursor, table, key, key_index, query, write_batch, what, writers=None, collapse=False, endpoint_filter=None,
+                 transform=None, where=None):
+    """Exporte une table (ou la partie de la table satisfaisant where) lot par lot, en série ou via le pipeline lecture/écriture."""
+    condition = f" WHERE {where}" if where else ""
+    name = table + condition
+    query += condition
+    if checkpoints and checkpoints.table(name)["done"]:
+        print(f"{name} already exported, skipping")
+        return
+
+    cursor.execute(f"SELECT COUNT(1) FROM {table}{condition}")
+    total = cursor.fetchval()
+    stage = run_metrics.stage(name, total, checkpoints.table(name)["count"] if checkpoints else 0)
+    batch_size = AdaptiveBatcher(BATCH_SIZE, target_latency=args.target_latency) if args.adaptive_batches else BATCH_SIZE
+
+    def write(rows):
+        written, dead, retries = len(rows), 0, 0
+        # Les lignes d'origine restent celles du point de reprise (clés SQL)
+        start = time.perf_counter()
+        batch = transform(rows) if transform is not None else rows
+        stage.add_transform(time.perf_counter() - start)
+        start = time.perf_counter()
+        if args.adaptive_batches:
+            # Les lots en échec sont coupés en deux et réessayés, les lignes
+            # qui échouent encore partent dans le fichier de lettres mortes
+            written, dead, retries = write_with_split(write_batch, batch, lambda r, e: dead_letters.write(name, r, e))
+            if retries:
+                batch_size.failure()
+            else:
+                batch_size.success(len(rows), time.perf_counter() - start)
+            if dead:
+                print(f"{dead} {what} written to {args.dead_letter}")
+        else:
+            try:
+                write_batch(batch)
+            except Exception as error:
+                stage.add_failure(time.perf_counter() - start)
+                if checkpoints:
+                    # Ne pas avancer le point de reprise au-delà d'un lot non écrit
+                    raise
+                print(error)
+                return
+        done = stage.add_write(written, time.perf_counter() - start, retries, dead)
+        if checkpoints:
+            # Un lot validé mais pas encore enregistré est relu à la reprise (voir skip_replayed, replace_replayed)
+            checkpoints.record(name, rows[-1][key_index], len(rows))
+        print(stage.progress(what, done))
 
+    if checkpoints:
+        state = checkpoints.table(name)
+        batches = keyset_batches(cursor, query, key, key_index, batch_size, after=state["last_key"])
+        # Un seul écrivain : les lots sont validés dans l'ordre des clés
+        writers = 1
+    elif args.sql_readers > 1:
+        # Une connexion par plage de clés, les lots sont fusionnés dans un seul flux
+        ranges = key_ranges(cursor, table, key, args.sql_readers)
+        batches = read_ranges(connect_sql, query, key, ranges, BATCH_SIZE)
+    else:
+        cursor.execute(query)
+        batches = fetch_batches(cursor, batch_size)
+
+    batches = timed(batches, stage.add_fetch)
+
+    if args.columnar:
+        batches = columnar_batches(batches)
+
+    if collapse:
+        # Lecture complète de la table avant le premier lot : les doublons peuvent être n'importe où
+        batches = collapse_duplicates(batches, BATCH_SIZE, args.collapse_memory)
+
+    if endpoint_filter is not None:
+        # Après la fusion des doublons : chaque triplet n'est testé qu'une fois
+        batches = endpoint_filter.filter_batches(batches)
+
+    batches = timed(batches, stage.add_read)
+
+    if args.pipeline:
+        run_pipeline(batches, write, writers=writers or args.writers, queue_size=args.queue_size)
+    else:
+        for rows in batches:
+            write(rows)
+
+    stage.finish()
+    if checkpoints:
+        checkpoints.done(name)
+
+
+def for_each_backend(action):
+    """action(backend) sur le backend, ou sur chaque destination --fanout encore valide (erreur = destination isolée)."""
+    if fanout is None:
+        action(backend)
+        return
+    for target in fanout.backends:
         try:
-            create_nodes(graph.auto(), importData, labels={"Artist"})
-            exportedCount += len(rows)
-            print(f"{exportedCount}/{totalCount} artist records exported to Neo4j")
+            action(target)
         except Exception as error:
-            print(error)
+            fanout.isolate(target, error)
+
+
+def create_schema(target):
+    """Contraintes d'unicité créées avant les nœuds, puis attente des index ONLINE."""
+    start = time.perf_counter()
+    print("Creating uniqueness constraints on Film(idFilm) and Artist(idArtist)...")
+    population = provision_schema(target.run, target.data, timeout=args.schema_timeout)
+    print(f"Schema ready in {time.perf_counter() - start:.1f} s (index population {population:.1f} s)")
+
+
+def write_films(rows):
+    importData = []
+    for row in rows:
+        # Créer un objet Node avec comme label Film et les propriétés adéquates
+        n = Node("Film", idFilm=row[0], primaryTitle=row[1], startYear=row[2])
+        importData.append(n)
+    create_nodes(graph.auto(), importData, labels={"Film"})
+
+
+def write_artists(rows):
+    importData = []
+    for row in rows:
+        # Créer un objet Node avec comme label Artist et les propriétés adéquates
+        n = Node("Artist", idArtist=row[0], primaryName=row[1], birthYear=row[2])
+        importData.append(n)
+    create_nodes(graph.auto(), importData, labels={"Artist"})
+
+
+def write_relationship_bucket(rows):
+    importData = { "acted in": [], "directed": [], "produced": [], "composed": [] }
+    for row in rows:
+        relTuple=(row[0], {}, row[2])
+        importData[row[1]].append(relTuple)
+
+    # Une seule transaction pour toutes les catégories : le lot est validé en entier ou pas du tout
+    tx = graph.begin()
+    for cat in importData:
+        # Utilisez la fonction create_relationships de py2neo pour créer les relations entre les noeuds Film et Name
+        # (les tuples nécessaires ont déjà été créés ci-dessus dans la boucle for précédente)
+        # https://py2neo.org/2021.1/bulk/index.html
+        # ATTENTION: remplacez les espaces par des _ pour nommer les types de relation
+        if importData[cat]:  # Vérifier qu'il y a des relations à créer
+            rel_type = cat.replace(" ", "_").upper()
+            create_relationships(tx, importData[cat], rel_type, start_node_key=("Artist", "idArtist"), end_node_key=("Film", "idFilm"))
+    graph.commit(tx)
+
+
+def write_nodes_fast(label, keys, rows):
+    if id_cache is not None:
+        id_cache.add(label, backend.create_nodes_returning_ids(label, keys, node_params(rows)))
+    else:
+        backend.create_nodes(label, keys, node_params(rows))
+
+
+def write_films_fast(rows):
+    write_nodes_fast("Film", FILM_KEYS, rows)
+
+
+def write_artists_fast(rows):
+    write_nodes_fast("Artist", ARTIST_KEYS, rows)
+
+
+def write_relationship_bucket_fast(rows):
+    by_type = relationship_params(rows)
+    by_id = None
+    if id_cache is not None:
+        # Les extrémités absentes du cache (export repris, nœud manquant) sont recherchées par clé
+        by_id, by_type = split_resolved(id_cache, by_type, "Artist", "Film")
+    backend.create_relationships(by_type, ("Artist", "idArtist"), ("Film", "idFilm"), by_id=by_id)
+
+
+def write_relationships(rows):
+    # Les sessions concurrentes ne verrouillent jamais le même Artist ou Film
+    write_partitioned(rows, write_relationship_bucket, args.rel_writers)
+
+
+checkpoints = CheckpointStore(args.checkpoint) if args.checkpoint else None
+dead_letters = DeadLetterFile(args.dead_letter)
+id_cache = NodeIdCache(args.id_cache_memory, args.id_cache_file) if args.id_cache else None
+node_transform = compact_node_rows if args.compact_keys else None
+relationship_transform = compact_relationship_rows if args.compact_keys else None
+endpoints = EndpointFilter(OrphanReport(args.orphan_report)) if args.skip_orphans else None
+degrees = DegreeCounter(args.degree_memory) if args.degree_properties else None
+run_metrics = RunMetrics()
+
+
+def write_reports(scheduler=None):
+    run_metrics.write_json(args.report, scheduler)
+    if args.prometheus:
+        run_metrics.write_prometheus(args.prometheus)
+    print(f"Run report written to {args.report}")
+
+
+def report_orphans():
+    if endpoints is not None:
+        endpoints.report.close()
+        print(endpoints.report.summary())
+
+
+if args.admin_import:
+    csv_export = AdminImportExport(args.admin_import, args.csv_rows_per_file, args.compress, args.collapse_duplicates,
+                                   args.compact_keys)
+    write_films_csv, write_artists_csv = csv_export.films.write, csv_export.artists.write
+    if endpoints is not None:
+        write_films_csv = endpoints.registering(endpoints.films, write_films_csv)
+        write_artists_csv = endpoints.registering(endpoints.artists, write_artists_csv)
+    with connect_sql() as conn:
+        cursor = conn.cursor()
+        export_table(cursor, "TFilm", "idFilm", 0, "SELECT idFilm, primaryTitle, startYear FROM TFilm", write_films_csv, "title records",
+                     transform=node_transform, where=subset.films)
+        export_table(cursor, "tArtist", "idArtist", 0, "SELECT idArtist, primaryName, birthYear FROM tArtist", write_artists_csv, "artist records",
+                     transform=node_transform, where=subset.artists)
+        export_table(cursor, "tJob", "idFilm", 2, "SELECT idArtist, category, idFilm FROM tJob", csv_export.write_relationships, "relationships",
+                     collapse=args.collapse_duplicates, endpoint_filter=endpoints, transform=relationship_transform,
+                     where=subset.jobs)
+    csv_export.close()
+    report_orphans()
+    write_reports()
+    print("Run the following command on the Neo4j server (database stopped):")
+    print(csv_export.command())
+    print("Then create the uniqueness constraints:")
+    for label, key in NODE_KEYS:
+        print(constraint_query(label, key) + ";")
+    sys.exit(0)
+
+
+def verify_graph():
+    """Compare SQL Server et chaque graphe Neo4j ; retourne False si une tranche diffère."""
+    # Seuls les serveurs Neo4j sont interrogés, pas les destinations fichiers de --fanout
+    targets = [target.backend for target in fanout.targets if isinstance(target.backend, tuple(BACKENDS.values()))] \
+        if fanout is not None else [backend]
+    consistent = True
+    with connect_sql() as conn:
+        for target in targets:
+            start = time.perf_counter()
+            print("Verifying the graph against SQL Server...")
+            verifier = GraphVerifier(conn.cursor(), target.data, args.verify_buckets, args.compact_keys,
+                                     subset.films, subset.artists, subset.jobs)
+            if verifier.run():
+                print(f"Graph consistent with SQL Server ({time.perf_counter() - start:.1f} s)")
+            else:
+                consistent = False
+                verifier.write_report(args.verify_report)
+                print(f"Differences written to {args.verify_report}")
+            print(verifier.summary())
+            orphans = verifier.orphan_jobs()
+            if orphans:
+                print(f"{orphans} tJob rows reference a missing artist or film and are not expected in the graph")
+    return consistent
+
+
+if args.verify_only:
+    consistent = verify_graph()
+    if fanout is not None:
+        fanout.close()
+    else:
+        backend.close()
+    sys.exit(0 if consistent else 1)
+
+if args.sync:
+    # Pas de suppression du graphe : seules les différences avec l'instantané sont appliquées
+    create_schema(backend)
+    store = SnapshotStore(args.sync)
+    with connect_sql() as conn:
+        cursor = conn.cursor()
+        for spec in (NodeTable("TFilm", "Film", "idFilm", ["primaryTitle", "startYear"]),
+                     NodeTable("tArtist", "Artist", "idArtist", ["primaryName", "birthYear"])):
+            upserted, deleted = sync_nodes(cursor, store, spec, backend.run, BATCH_SIZE)
+            print(f"{spec.table}: {upserted} nodes created or updated, {deleted} nodes deleted")
+        created, deleted = sync_relationships(cursor, store, backend.run, BATCH_SIZE)
+        print(f"tJob: {created} relationships created, {deleted} relationships deleted")
+    store.close()
+    sys.exit(0)
+
+if args.fast_path or args.columnar or args.id_cache or args.collapse_duplicates or args.backend == "driver" or args.sink != "neo4j":
+    write_films, write_artists, write_relationship_bucket = write_films_fast, write_artists_fast, write_relationship_bucket_fast
+
+if args.load_csv:
+    # Le serveur lit les CSV lui-même : les écritures de nœuds et de relations passent par LOAD CSV
+    if args.load_csv_serve:
+        serve_directory(args.load_csv, args.load_csv_serve)
+    loader = LoadCsvLoader(backend.run, args.load_csv, args.load_csv_url, BATCH_SIZE, args.compact_keys)
+    write_films, write_artists, write_relationship_bucket = loader.films, loader.artists, loader.relationships
+else:
+    # Un deadlock annule la transaction du lot entier : il est réécrit au lieu d'être perdu
+    # (LOAD CSV valide un fichier par type de relation, chaque fichier est réessayé par le loader)
+    write_relationship_bucket = retrying(write_relationship_bucket)
+
+if checkpoints and checkpoints.resuming:
+    # Le dernier lot de nœuds validé avant l'arrêt a pu ne pas être enregistré : le recréer violerait la contrainte d'unicité
+    write_films = skip_replayed(backend.data, "Film", "idFilm", write_films)
+    write_artists = skip_replayed(backend.data, "Artist", "idArtist", write_artists)
+    # Pour les relations, CREATE les doublerait : celles des films du lot relu sont remplacées
+    write_relationships = replace_replayed(backend.evaluate, write_relationships)
+
+if fanout is not None:
+    # Chaque lot lu est déposé dans la file de chaque destination
+    write_films = fanout.writer(lambda target, rows: target.create_nodes("Film", FILM_KEYS, node_params(rows)))
+    write_artists = fanout.writer(lambda target, rows: target.create_nodes("Artist", ARTIST_KEYS, node_params(rows)))
+    write_relationships = fanout.writer(lambda target, rows: target.create_relationships(
+        relationship_params(rows), ("Artist", "idArtist"), ("Film", "idFilm")), exclusive=True)
+
+if endpoints is not None:
+    # Les clés ne sont enregistrées qu'une fois le lot de nœuds écrit (--fanout : déposé dans les files)
+    write_films = endpoints.registering(endpoints.films, write_films)
+    write_artists = endpoints.registering(endpoints.artists, write_artists)
+
+if degrees is not None:
+    # Seules les relations effectivement écrites (orphelins écartés, clés compactes) sont comptées
+    write_relationships = degrees.counting(write_relationships)
+
+if args.parallel_stages > 1:
+    # Les étapes par catégorie lisent en parallèle mais créent leurs relations l'une après l'autre :
+    # un acteur-réalisateur verrouillé par deux étapes à la fois provoquerait des deadlocks
+    write_relationships = serialized(write_relationships)
+
+
+def prepare_graph():
+    resuming = checkpoints and checkpoints.resuming
+    if resuming:
+        print(f"Resuming export from {args.checkpoint}...")
+
+    def prepare(target):
+        if not resuming:
+            print("Deleting existing nodes and relationships...")
+            if args.recreate_database:
+                recreate_database(target.run_system, args.recreate_database)
+            else:
+                truncate_graph(target.evaluate, ["Artist", "Film"], args.truncate_batch)
+
+        # Avant les nœuds : chaque index de contrainte est maintenu pendant le chargement au lieu d'être peuplé après
+        create_schema(target)
+
+    for_each_backend(prepare)
+
+
+def wait_indexes():
+    if fanout is not None:
+        # Avec plusieurs écrivains par destination, un lot de relations pourrait précéder les derniers nœuds
+        fanout.flush()
+
+    # Les MATCH des relations doivent trouver des index en ligne, jamais un parcours par label
+    def wait(target):
+        waited = wait_for_indexes(target.data, args.schema_timeout)
+        print(f"Indexes online (waited {waited:.1f} s)")
+
+    for_each_backend(wait)
+
+
+def write_degrees():
+    if fanout is not None:
+        # Les SET sur les nœuds ne doivent pas croiser les dernières créations de relations
+        fanout.flush()
+    start = time.perf_counter()
+
+    def write(target):
+        films, artists = degrees.write(target.run, BATCH_SIZE)
+        print(f"Aggregate properties set on {films} films and {artists} artists")
 
     try:
-        print("Indexing Film nodes...")
-        graph.run("CREATE INDEX ON :Film(idFilm)")
-        print("Indexing Name (Artist) nodes...")
-        graph.run("CREATE INDEX ON :Artist(idArtist)")
-    except Exception as error:
-        print(error)
-
-
-    # Relationships
-    exportedCount = 0
-    cursor.execute("SELECT COUNT(1) FROM tJob")
-    totalCount = cursor.fetchval()
-    cursor.execute(f"SELECT idArtist, category, idFilm FROM tJob")
-    while True:
-        importData = { "acted in": [], "directed": [], "produced": [], "composed": [] }
-        rows = cursor.fetchmany(BATCH_SIZE)
-        if not rows:
-            break
-
-        for row in rows:
-            relTuple=(row[0], {}, row[2])
-            importData[row[1]].append(relTuple)
+        for_each_backend(write)
+    finally:
+        degrees.close()
+    print(f"categoryMask bits: {degrees.legend()}")
+    wait_indexes()
+    print(f"Aggregate properties written in {time.perf_counter() - start:.1f} s")
 
-        try:
-            for cat in importData:
-                # Utilisez la fonction create_relationships de py2neo pour créer les relations entre les noeuds Film et Name
-                # (les tuples nécessaires ont déjà été créés ci-dessus dans la boucle for précédente)
-                # https://py2neo.org/2021.1/bulk/index.html
-                # ATTENTION: remplacez les espaces par des _ pour nommer les types de relation
-                if importData[cat]:  # Vérifier qu'il y a des relations à créer
-                    rel_type = cat.replace(" ", "_").upper()
-                    create_relationships(graph.auto(), importData[cat], rel_type, start_node_key=("Artist", "idArtist"), end_node_key=("Film", "idFilm"))
-            exportedCount += len(rows)
-            print(f"{exportedCount}/{totalCount} relationships exported to Neo4j")
-        except Exception as error:
-            print(error)
+
+def export_stage(*table_args, **table_kwargs):
+    """export_table avec sa propre connexion SQL : deux étapes parallèles ne partagent pas de curseur."""
+    conn = connect_sql()
+    try:
+        export_table(conn.cursor(), *table_args, **table_kwargs)
+    finally:
+        conn.close()
+
+
+def relationship_categories():
+    """Catégories de tJob, une étape de relations par catégorie."""
+    with connect_sql() as conn:
+        cursor = conn.cursor()
+        condition = f" WHERE {subset.jobs}" if subset.jobs else ""
+        cursor.execute(f"SELECT DISTINCT category FROM tJob{condition} ORDER BY category")
+        return [row[0] for row in cursor.fetchall()]
+
+
+# Deux lots écrits en même temps par le pipeline pourraient verrouiller les mêmes nœuds :
+# avec --rel-writers, le parallélisme vient uniquement du partitionnement
+rel_pipeline_writers = 1 if args.rel_writers > 1 else None
+
+if subset.active:
+    print(f"Exporting a subset: {subset.describe()}")
+
+scheduler = StageScheduler(args.parallel_stages)
+scheduler.add("schema", prepare_graph)
+# Films
+scheduler.add("films", lambda: export_stage("TFilm", "idFilm", 0, "SELECT idFilm, primaryTitle, startYear FROM TFilm",
+                                            write_films, "title records", transform=node_transform, where=subset.films),
+              after=["schema"])
+# Names
+scheduler.add("artists", lambda: export_stage("tArtist", "idArtist", 0, "SELECT idArtist, primaryName, birthYear FROM tArtist",
+                                              write_artists, "artist records", transform=node_transform, where=subset.artists),
+              after=["schema"])
+scheduler.add("indexes", wait_indexes, after=["films", "artists"])
+
+# Relationships
+relationship_stages = []
+if args.parallel_stages > 1:
+    # Une étape par catégorie : elles ne dépendent que des deux labels indexés
+    for category in relationship_categories():
+        where = and_where(subset.jobs, "category = '" + category.replace("'", "''") + "'")
+        relationship_stages.append(f"relationships {category}")
+        scheduler.add(f"relationships {category}",
+                      lambda where=where, category=category: export_stage(
+                          "tJob", "idFilm", 2, "SELECT idArtist, category, idFilm FROM tJob", write_relationships,
+                          f"{category} relationships", writers=rel_pipeline_writers, collapse=args.collapse_duplicates,
+                          endpoint_filter=endpoints, transform=relationship_transform, where=where),
+                      after=["indexes"])
+else:
+    # Une seule lecture de tJob quand les étapes s'exécutent l'une après l'autre
+    relationship_stages.append("relationships")
+    scheduler.add("relationships",
+                  lambda: export_stage("tJob", "idFilm", 2, "SELECT idArtist, category, idFilm FROM tJob", write_relationships,
+                                       "relationships", writers=rel_pipeline_writers, collapse=args.collapse_duplicates,
+                                       endpoint_filter=endpoints, transform=relationship_transform, where=subset.jobs),
+                  after=["indexes"])
+
+if degrees is not None:
+    # Les agrégats ne sont complets qu'après toutes les relations
+    scheduler.add("degrees", write_degrees, after=relationship_stages)
+
+try:
+    scheduler.run()
+    if fanout is not None:
+        # Les lots encore en file sont écrits avant le rapport
+        fanout.join()
+finally:
+    # Rapport écrit même après une erreur : il montre où l'export s'est arrêté
+    write_reports(scheduler)
+print("Stages:")
+print(scheduler.summary())
+
+report_orphans()
+if checkpoints:
+    checkpoints.clear()
+if id_cache is not None:
+    id_cache.close()
+consistent = verify_graph() if args.verify else True
+if fanout is not None:
+    fanout.close()
+    print("Fan-out targets:")
+    print(fanout.summary())
+else:
+    if args.sink != "neo4j":
+        print(backend.summary())
+    backend.close()
+if not consistent:
+    sys.exit(1)
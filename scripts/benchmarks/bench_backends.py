@@ -0,0 +1,93 @@
+"""
+Benchmark des backends d'écriture Neo4j de export-neo4j.py (py2neo / driver).
+
+Charge le même jeu de données synthétique avec chaque backend, sous des
+labels dédiés (BenchFilm, BenchArtist) pour ne pas toucher aux données du
+TP, et affiche le débit (lignes/s) et le temps CPU consommé côté client.
+Les nœuds et relations de test sont supprimés après chaque mesure.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour importer db_connector et neo4j_export
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_transform import job_rows
+from db_connector import DatabaseConnector
+from neo4j_export.backends import BACKENDS
+from neo4j_export.transform import FILM_KEYS, node_params, relationship_params
+from neo4j_export.truncate import delete_in_batches
+
+FILM_LABEL = "BenchFilm"
+ARTIST_LABEL = "BenchArtist"
+ARTIST_KEYS = ["idArtist"]
+
+
+def clean(backend, batch_size):
+    """Supprime les relations et nœuds de test, sans toucher aux autres labels."""
+    delete_in_batches(backend.evaluate, f"(:{ARTIST_LABEL})-[x]->(:{FILM_LABEL})", "relationships", batch_size)
+    for label in (ARTIST_LABEL, FILM_LABEL):
+        delete_in_batches(backend.evaluate, f"(x:{label})", f"{label} nodes", batch_size)
+
+
+def load(backend, films, artists, jobs, batch_size):
+    """
+    Charge les données par lots.
+
+    Returns:
+        tuple: (durée totale en secondes, temps CPU client en secondes)
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for i in range(0, len(films), batch_size):
+        backend.create_nodes(FILM_LABEL, FILM_KEYS, node_params(films[i:i + batch_size]))
+    for i in range(0, len(artists), batch_size):
+        backend.create_nodes(ARTIST_LABEL, ARTIST_KEYS, node_params(artists[i:i + batch_size]))
+    for i in range(0, len(jobs), batch_size):
+        backend.create_relationships(relationship_params(jobs[i:i + batch_size]),
+                                     (ARTIST_LABEL, "idArtist"), (FILM_LABEL, "idFilm"))
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def main():
+    """Fonction principale du benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="nombre de relations (tJob) à charger")
+    parser.add_argument("--batch-size", type=int, default=10000, help="nombre de lignes par lot")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    jobs = job_rows(args.rows)
+    films = sorted({(row[2], f"Film {row[2]}", 2000) for row in jobs})
+    artists = sorted({(row[0],) for row in jobs})
+    total = len(films) + len(artists) + len(jobs)
+
+    db = DatabaseConnector()
+    auth = (db.neo4j_user, db.neo4j_password)
+
+    print("=" * 60)
+    print(f"Chargement de {len(films):,} films, {len(artists):,} artistes et {len(jobs):,} relations")
+    print("=" * 60)
+
+    for name in args.backends:
+        backend = BACKENDS[name](db.neo4j_server, auth)
+        try:
+            clean(backend, args.batch_size)
+            backend.run(f"CREATE INDEX bench_film IF NOT EXISTS FOR (n:{FILM_LABEL}) ON (n.idFilm)")
+            backend.run(f"CREATE INDEX bench_artist IF NOT EXISTS FOR (n:{ARTIST_LABEL}) ON (n.idArtist)")
+            backend.run("CALL db.awaitIndexes(300)")
+
+            seconds, cpu = load(backend, films, artists, jobs, args.batch_size)
+            print(f"{name:<8}: {total / seconds:>10,.0f} lignes/s  "
+                  f"({seconds:.1f} s, CPU client {cpu:.1f} s, {cpu / seconds:.0%})")
+
+            clean(backend, args.batch_size)
+        finally:
+            backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Micro-benchmark de l'étape de transformation de export-neo4j.py.
+
+Compare, en lignes par seconde, la construction d'objets py2neo.data.Node
+(chemin historique) et la conversion directe en listes de valeurs
+(option --fast-path), sur des lignes synthétiques au format de TFilm et tJob.
+Si NumPy est installé, mesure aussi la conversion en colonnes (--columnar)
+et la préparation à partir des colonnes.
+Aucune connexion aux bases n'est nécessaire.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from py2neo.data import Node
+
+# Ajouter le répertoire parent au path pour importer neo4j_export
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from neo4j_export.transform import node_params, relationship_params
+
+CATEGORIES = ["acted in", "directed", "produced", "composed"]
+
+
+def film_rows(count):
+    return [(f"tt{i:07d}", f"Film {i}", 1900 + i % 120) for i in range(count)]
+
+
+def job_rows(count):
+    return [(f"nm{i % 50000:07d}", CATEGORIES[i % 4], f"tt{i % 20000:07d}") for i in range(count)]
+
+
+def films_as_nodes(rows):
+    return [Node("Film", idFilm=row[0], primaryTitle=row[1], startYear=row[2]) for row in rows]
+
+
+def jobs_as_tuples(rows):
+    importData = { "acted in": [], "directed": [], "produced": [], "composed": [] }
+    for row in rows:
+        importData[row[1]].append((row[0], {}, row[2]))
+    return importData
+
+
+def measure(function, rows, repeat):
+    """Retourne le meilleur débit (lignes/s) sur repeat exécutions."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main():
+    """Fonction principale du benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="nombre de lignes par mesure")
+    parser.add_argument("--repeat", type=int, default=5, help="nombre de répétitions (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    films = film_rows(args.rows)
+    jobs = job_rows(args.rows)
+
+    print("=" * 60)
+    print(f"Transformation de {args.rows:,} lignes (meilleur de {args.repeat})")
+    print("=" * 60)
+    cases = [
+        ("Film   Node()          ", films_as_nodes, films),
+        ("Film   --fast-path     ", node_params, films),
+        ("tJob   tuples par dict ", jobs_as_tuples, jobs),
+        ("tJob   --fast-path     ", relationship_params, jobs),
+    ]
+    try:
+        from neo4j_export.columnar import ColumnarReader
+    except ImportError:
+        ColumnarReader = None
+    if ColumnarReader is not None:
+        film_batch = ColumnarReader().convert(films)
+        job_batch = ColumnarReader().convert(jobs)
+        cases += [
+            ("Film   en colonnes     ", lambda rows: ColumnarReader().convert(rows), films),
+            ("Film   --columnar      ", node_params, film_batch),
+            ("tJob   en colonnes     ", lambda rows: ColumnarReader().convert(rows), jobs),
+            ("tJob   --columnar      ", relationship_params, job_batch),
+        ]
+    for name, function, rows in cases:
+        print(f"{name}: {measure(function, rows, args.repeat):>12,.0f} lignes/s")
+
+
+if __name__ == "__main__":
+    main()
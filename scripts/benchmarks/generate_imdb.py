@@ -0,0 +1,254 @@
+"""
+Générateur de données synthétiques au format IMDB du TP (TFilm, tArtist, tJob).
+
+Produit des jeux de données de taille contrôlée (facteur d'échelle 0.1, 1,
+10, 100...) pour mesurer l'export et les requêtes des exercices sans la
+base Azure SQL, dont la taille est fixe. Les distributions imitent celles
+des données réelles :
+- nombre de crédits par film en loi de puissance (Pareto) : beaucoup de
+  petits films, quelques distributions très fournies ;
+- popularité des artistes asymétrique : quelques artistes très prolifiques ;
+- répartition des catégories (acted in majoritaire) ;
+- années de naissance autour de 1960, avec une part de valeurs nulles ;
+- années de sortie plus nombreuses vers la période récente ;
+- crédits en double (même artiste, même catégorie, même film) ;
+- optionnellement, des crédits vers des artistes ou films inexistants.
+
+Destinations :
+- --sqlite FICHIER : base SQLite (requêtes des exercices, tests locaux) ;
+- --odbc CHAINE : base SQL Server locale (ex. conteneur mssql), utilisable
+  telle quelle par export-neo4j.py en pointant TPBDD_SERVER dessus ;
+- --csv DOSSIER : fichiers TFilm.csv, tArtist.csv, tJob.csv.
+
+La génération est déterministe (--seed) et se fait par morceaux : la
+mémoire reste constante quel que soit le facteur d'échelle.
+"""
+
+import argparse
+import csv
+import random
+import sqlite3
+import time
+from pathlib import Path
+
+# Taille nominale du facteur 1
+BASE_FILMS = 100000
+BASE_ARTISTS = 150000
+
+CATEGORIES = ["acted in", "directed", "produced", "composed"]
+CATEGORY_WEIGHTS = [0.70, 0.10, 0.12, 0.08]
+
+# Lignes insérées par appel
+CHUNK = 50000
+
+TABLES = {
+    "TFilm": ("CREATE TABLE TFilm (idFilm VARCHAR(10) NOT NULL PRIMARY KEY, "
+              "primaryTitle NVARCHAR(400), startYear INT)"),
+    "tArtist": ("CREATE TABLE tArtist (idArtist VARCHAR(10) NOT NULL PRIMARY KEY, "
+                "primaryName NVARCHAR(200), birthYear INT)"),
+    "tJob": "CREATE TABLE tJob (idFilm VARCHAR(10) NOT NULL, idArtist VARCHAR(10) NOT NULL, category VARCHAR(20))",
+}
+INDEXES = [
+    "CREATE INDEX ix_tJob_idFilm ON tJob (idFilm)",
+    "CREATE INDEX ix_tJob_idArtist ON tJob (idArtist)",
+]
+COLUMNS = {
+    "TFilm": ["idFilm", "primaryTitle", "startYear"],
+    "tArtist": ["idArtist", "primaryName", "birthYear"],
+    "tJob": ["idFilm", "idArtist", "category"],
+}
+
+WORDS = ["Night", "Love", "Return", "City", "Last", "Story", "Dark", "Summer", "King", "River",
+         "Secret", "Journey", "Ghost", "Blue", "War", "Dream", "Été", "Château", "Mémoire", "Île"]
+FIRST_NAMES = ["Anna", "Jack", "Marie", "John", "Léa", "Paul", "Sofia", "Omar", "Yuki", "Chloé", "Raj", "Emma"]
+LAST_NAMES = ["Black", "Martin", "Smith", "Dubois", "Kim", "Rossi", "García", "Müller", "Nguyen", "Silva"]
+
+
+class Ids:
+    """
+    Identifiants IMDB croissants avec des trous, comme dans les données
+    réelles, calculés à partir du rang : rien n'est gardé en mémoire.
+    """
+
+    def __init__(self, prefix, count):
+        self.prefix = prefix
+        self.count = count
+
+    def __getitem__(self, i):
+        # 3 numéros sautés tous les 5 identifiants
+        return f"{self.prefix}{1 + i + i // 5 * 3:07d}"
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+    def missing(self, rng):
+        """Identifiant absent de la table (au-delà du plus grand)."""
+        return f"{self.prefix}{self.count * 2 + rng.randint(1, 1000000):07d}"
+
+
+def films(ids, rng):
+    for idFilm in ids:
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        # Plus de films récents : triangulaire vers 2020, 3 % sans année
+        year = None if rng.random() < 0.03 else int(rng.triangular(1900, 2024, 2020))
+        yield idFilm, title, year
+
+
+def artists(ids, rng):
+    for idArtist in ids:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        # 40 % sans année de naissance
+        year = None if rng.random() < 0.4 else max(1850, min(2015, int(rng.gauss(1960, 20))))
+        yield idArtist, name, year
+
+
+def jobs(film_ids, artist_ids, rng, duplicate_rate, orphan_rate):
+    """Crédits (idFilm, idArtist, category) film par film."""
+    for idFilm in film_ids:
+        # Pareto(2) de moyenne 2 : 6 crédits par film en moyenne, plafonné
+        for _ in range(min(500, int(rng.paretovariate(2.0) * 3))):
+            # random() ** 3 concentre les crédits sur les premiers artistes (les plus prolifiques)
+            idArtist = artist_ids[int(artist_ids.count * rng.random() ** 3)]
+            category = rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0]
+            if orphan_rate and rng.random() < orphan_rate:
+                # Crédit vers un film ou un artiste absent de sa table
+                if rng.random() < 0.5:
+                    yield film_ids.missing(rng), idArtist, category
+                else:
+                    yield idFilm, artist_ids.missing(rng), category
+                continue
+            yield idFilm, idArtist, category
+            if rng.random() < duplicate_rate:
+                yield idFilm, idArtist, category
+
+
+def chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class SqliteSink:
+    """Tables dans une base SQLite (recréée)."""
+
+    def __init__(self, path):
+        Path(path).unlink(missing_ok=True)
+        self.conn = sqlite3.connect(path)
+        for create in TABLES.values():
+            self.conn.execute(create)
+
+    def insert(self, table, rows):
+        placeholders = ", ".join("?" * len(COLUMNS[table]))
+        self.conn.executemany(f"INSERT INTO {table} ({', '.join(COLUMNS[table])}) VALUES ({placeholders})", rows)
+
+    def close(self):
+        for index in INDEXES:
+            self.conn.execute(index)
+        self.conn.commit()
+        self.conn.close()
+
+
+class OdbcSink(SqliteSink):
+    """Tables dans une base SQL Server via pyodbc (tables existantes supprimées)."""
+
+    def __init__(self, connection_string):
+        # Import local : pyodbc n'est requis que pour cette destination
+        import pyodbc
+
+        self.conn = pyodbc.connect(connection_string)
+        cursor = self.conn.cursor()
+        cursor.fast_executemany = True
+        self.cursor = cursor
+        for table, create in TABLES.items():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(create)
+        self.conn.commit()
+
+    def insert(self, table, rows):
+        placeholders = ", ".join("?" * len(COLUMNS[table]))
+        self.cursor.executemany(f"INSERT INTO {table} ({', '.join(COLUMNS[table])}) VALUES ({placeholders})", rows)
+        self.conn.commit()
+
+
+class CsvSink:
+    """Un fichier CSV avec en-tête par table (NULL = champ vide)."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.files = {}
+
+    def insert(self, table, rows):
+        if table not in self.files:
+            f = open(self.directory / f"{table}.csv", "w", newline="", encoding="utf-8")
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS[table])
+            self.files[table] = (f, writer)
+        self.files[table][1].writerows(rows)
+
+    def close(self):
+        for f, _ in self.files.values():
+            f.close()
+
+
+def generate(sink, scale, seed=42, duplicate_rate=0.02, orphan_rate=0.0):
+    """
+    Génère les trois tables dans une destination.
+
+    Returns:
+        dict: Nombre de lignes par table
+    """
+    rng = random.Random(seed)
+    film_ids = Ids("tt", max(1, int(BASE_FILMS * scale)))
+    artist_ids = Ids("nm", max(1, int(BASE_ARTISTS * scale)))
+    counts = {}
+    for table, rows in (("TFilm", films(film_ids, rng)),
+                        ("tArtist", artists(artist_ids, rng)),
+                        ("tJob", jobs(film_ids, artist_ids, rng, duplicate_rate, orphan_rate))):
+        counts[table] = 0
+        for chunk in chunks(rows):
+            sink.insert(table, chunk)
+            counts[table] += len(chunk)
+        print(f"  {table}: {counts[table]:,} lignes")
+    return counts
+
+
+def main():
+    """Fonction principale du générateur."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"facteur d'échelle (1 = {BASE_FILMS:,} films, {BASE_ARTISTS:,} artistes, ~6 crédits par film)")
+    parser.add_argument("--seed", type=int, default=42, help="graine du générateur aléatoire")
+    parser.add_argument("--duplicate-rate", type=float, default=0.02, help="proportion de crédits en double")
+    parser.add_argument("--orphan-rate", type=float, default=0.0,
+                        help="proportion de crédits vers un artiste ou un film inexistant")
+    destination = parser.add_mutually_exclusive_group(required=True)
+    destination.add_argument("--sqlite", metavar="FICHIER", help="base SQLite à créer")
+    destination.add_argument("--odbc", metavar="CHAINE", help="chaîne de connexion pyodbc vers un SQL Server local")
+    destination.add_argument("--csv", metavar="DOSSIER", help="dossier des fichiers CSV")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        sink = SqliteSink(args.sqlite)
+    elif args.odbc:
+        sink = OdbcSink(args.odbc)
+    else:
+        sink = CsvSink(args.csv)
+
+    print("=" * 60)
+    print(f"Génération IMDB synthétique, facteur {args.scale:g} (graine {args.seed})")
+    print("=" * 60)
+    start = time.perf_counter()
+    counts = generate(sink, args.scale, args.seed, args.duplicate_rate, args.orphan_rate)
+    sink.close()
+    elapsed = time.perf_counter() - start
+    print(f"{sum(counts.values()):,} lignes en {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
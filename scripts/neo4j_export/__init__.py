@@ -0,0 +1,4 @@
+"""
+Briques réutilisables pour l'export des données IMDB de SQL Server vers Neo4j.
+Utilisé par le programme export-neo4j.py à la racine du projet.
+"""
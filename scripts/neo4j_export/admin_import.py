@@ -0,0 +1,121 @@
+"""
+Export hors ligne au format CSV de neo4j-admin database import.
+
+Pour une base vide, neo4j-admin construit directement les fichiers de
+stockage sans passer par les transactions Bolt. Chaque fichier CSV a un
+en-tête séparé (films-header.csv) et ses données sont découpées en
+morceaux (films-part-0001.csv.gz, ...) que l'outil d'import lit à la suite.
+"""
+
+import csv
+import gzip
+import threading
+from pathlib import Path
+
+FILM_HEADER = ["idFilm:ID(Film)", "primaryTitle", "startYear:int"]
+ARTIST_HEADER = ["idArtist:ID(Artist)", "primaryName", "birthYear:int"]
+RELATIONSHIP_HEADER = [":START_ID(Artist)", ":END_ID(Film)", ":TYPE"]
+
+
+class CsvChunkWriter:
+    """Écrit un fichier d'en-tête et des morceaux de données CSV numérotés."""
+
+    def __init__(self, directory, prefix, header, rows_per_file=1000000, compress=False):
+        """
+        Args:
+            directory (str): Dossier de sortie
+            prefix (str): Préfixe des fichiers (films, artists...)
+            header (list): Colonnes de l'en-tête neo4j-admin
+            rows_per_file (int): Nombre de lignes par morceau, 0 pour un seul fichier
+            compress (bool): Compresser les morceaux en gzip
+        """
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.rows_per_file = rows_per_file
+        self.compress = compress
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._rows_in_file = 0
+        self._parts = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.header_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(header)
+
+    @property
+    def header_path(self):
+        return self.directory / f"{self.prefix}-header.csv"
+
+    @property
+    def files(self):
+        """Liste des fichiers au format attendu par --nodes / --relationships."""
+        extension = ".csv.gz" if self.compress else ".csv"
+        return f"{self.header_path},{self.directory / self.prefix}-part-[0-9]+{extension}"
+
+    def _open_next(self):
+        if self._file:
+            self._file.close()
+        self._parts += 1
+        path = self.directory / f"{self.prefix}-part-{self._parts:04d}.csv"
+        if self.compress:
+            self._file = gzip.open(f"{path}.gz", "wt", newline="", encoding="utf-8")
+        else:
+            self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._rows_in_file = 0
+
+    def write(self, rows):
+        """Ajoute des lignes (les valeurs None deviennent des champs vides, lus comme null)."""
+        with self._lock:
+            for row in rows:
+                if self._file is None or (self.rows_per_file and self._rows_in_file >= self.rows_per_file):
+                    self._open_next()
+                self._writer.writerow(row)
+                self._rows_in_file += 1
+            self.count += len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class AdminImportExport:
+    """Fichiers CSV des nœuds Film, Artist et des relations de tJob."""
+
+    def __init__(self, directory, rows_per_file=1000000, compress=False, weighted=False, integer_ids=False):
+        """
+        Args:
+            directory (str): Dossier de sortie
+            rows_per_file (int): Nombre de lignes par morceau, 0 pour un seul fichier
+            compress (bool): Compresser les morceaux en gzip
+            weighted (bool): Les relations portent une propriété count (doublons fusionnés)
+            integer_ids (bool): Identifiants entiers (keys.node_key), importés avec --id-type=INTEGER
+        """
+        self.integer_ids = integer_ids
+        relationship_header = RELATIONSHIP_HEADER + ["count:int"] if weighted else RELATIONSHIP_HEADER
+        self.films = CsvChunkWriter(directory, "films", FILM_HEADER, rows_per_file, compress)
+        self.artists = CsvChunkWriter(directory, "artists", ARTIST_HEADER, rows_per_file, compress)
+        self.relationships = CsvChunkWriter(directory, "relationships", relationship_header, rows_per_file, compress)
+
+    def write_relationships(self, rows):
+        """Écrit des lignes (idArtist, category, idFilm[, count]) avec le type de relation."""
+        self.relationships.write([(row[0], row[2], row[1].replace(" ", "_").upper()) + tuple(row[3:]) for row in rows])
+
+    def close(self):
+        for writer in (self.films, self.artists, self.relationships):
+            writer.close()
+
+    def command(self, database="neo4j"):
+        """Commande neo4j-admin à lancer sur le serveur, base arrêtée."""
+        id_type = " --id-type=INTEGER" if self.integer_ids else ""
+        return (
+            f"neo4j-admin database import full {database} --overwrite-destination"
+            f" --skip-bad-relationships --skip-duplicate-nodes{id_type}"
+            f" --nodes=Film=\"{self.films.files}\""
+            f" --nodes=Artist=\"{self.artists.files}\""
+            f" --relationships=\"{self.relationships.files}\""
+        )
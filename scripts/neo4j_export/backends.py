@@ -0,0 +1,192 @@
+"""
+Backends d'écriture dans Neo4j.
+
+Deux implémentations de la même interface :
+- Py2neoBackend s'appuie sur py2neo.bulk (create_nodes, create_relationships) ;
+- DriverBackend utilise le driver officiel neo4j : chaque lot est envoyé
+  en une requête UNWIND $rows AS row ... dans une transaction d'écriture
+  gérée (execute_write, rejouée automatiquement en cas d'erreur
+  transitoire).
+
+Le texte des requêtes UNWIND est construit une seule fois par label ou
+type de relation, ce qui permet au serveur de réutiliser son plan
+d'exécution.
+
+Les nœuds sont fournis en listes de valeurs (voir transform.node_params) et
+les relations en dictionnaire type -> triplets (début, propriétés, fin)
+(voir transform.relationship_params).
+"""
+
+from functools import lru_cache
+
+from py2neo import Graph
+from py2neo.bulk import create_nodes, create_relationships
+
+
+@lru_cache(maxsize=None)
+def node_query(label, keys, returning_ids=False):
+    """Requête UNWIND de création de nœuds à partir de listes de valeurs."""
+    properties = ", ".join(f"{key}: row[{i}]" for i, key in enumerate(keys))
+    query = f"UNWIND $rows AS row CREATE (n:{label} {{{properties}}})"
+    if returning_ids:
+        query += " RETURN row[0], elementId(n)"
+    return query
+
+
+def _create_relationship(rel_type, with_properties):
+    # Les propriétés, quand il y en a, sont le troisième élément de chaque ligne
+    if with_properties:
+        return f"CREATE (a)-[r:{rel_type}]->(b) SET r += row[2]"
+    return f"CREATE (a)-[:{rel_type}]->(b)"
+
+
+@lru_cache(maxsize=None)
+def relationship_query(rel_type, start_node_key, end_node_key, with_properties=False):
+    """Requête UNWIND de création de relations entre nœuds retrouvés par clé."""
+    (start_label, start_key), (end_label, end_key) = start_node_key, end_node_key
+    return (
+        f"UNWIND $rows AS row "
+        f"MATCH (a:{start_label} {{{start_key}: row[0]}}) "
+        f"MATCH (b:{end_label} {{{end_key}: row[1]}}) "
+        + _create_relationship(rel_type, with_properties)
+    )
+
+
+@lru_cache(maxsize=None)
+def relationship_by_id_query(rel_type, with_properties=False):
+    """Requête UNWIND de création de relations entre nœuds retrouvés par elementId."""
+    return (
+        f"UNWIND $rows AS row "
+        f"MATCH (a) WHERE elementId(a) = row[0] "
+        f"MATCH (b) WHERE elementId(b) = row[1] "
+        + _create_relationship(rel_type, with_properties)
+    )
+
+
+def relationship_rows(triples):
+    """
+    Convertit des triplets (début, propriétés, fin) en lignes [début, fin(, propriétés)].
+
+    Les propriétés ne sont envoyées que si le lot en porte (ex. count).
+
+    Returns:
+        tuple: (lignes, True si les lignes portent des propriétés)
+    """
+    if any(properties for _, properties, _ in triples):
+        return [[start, end, properties] for start, properties, end in triples], True
+    return [[start, end] for start, _, end in triples], False
+
+
+class Py2neoBackend:
+    """Écriture via py2neo.bulk."""
+
+    def __init__(self, uri, auth):
+        self.uri = uri
+        self.auth = auth
+        self.graph = Graph(uri, auth=auth)
+
+    def run(self, query, **params):
+        """Exécute une requête en auto-commit."""
+        self.graph.run(query, **params)
+
+    def evaluate(self, query, **params):
+        """Exécute une requête et retourne la première valeur du premier résultat."""
+        return self.graph.run(query, **params).evaluate()
+
+    def data(self, query, **params):
+        """Exécute une requête et retourne les résultats en dictionnaires."""
+        return self.graph.run(query, **params).data()
+
+    def run_system(self, query):
+        """Exécute une requête d'administration sur la base system."""
+        Graph(self.uri, auth=self.auth, name="system").run(query)
+
+    def create_nodes(self, label, keys, rows):
+        create_nodes(self.graph.auto(), rows, labels={label}, keys=keys)
+
+    def create_nodes_returning_ids(self, label, keys, rows):
+        """Crée des nœuds et retourne les couples (première valeur, elementId)."""
+        cursor = self.graph.auto().run(node_query(label, tuple(keys), True), rows=rows)
+        return [tuple(record) for record in cursor]
+
+    def create_relationships(self, by_type, start_node_key, end_node_key, by_id=None):
+        """
+        Crée des relations par type, dans une seule transaction : le lot est
+        validé en entier ou pas du tout.
+
+        Args:
+            by_type (dict): Type -> triplets (clé début, propriétés, clé fin)
+            start_node_key (tuple): (label, propriété) du nœud de départ
+            end_node_key (tuple): (label, propriété) du nœud d'arrivée
+            by_id (dict): Type -> triplets (elementId début, propriétés, elementId fin) déjà résolus
+        """
+        tx = self.graph.begin()
+        for rel_type, triples in by_type.items():
+            create_relationships(tx, triples, rel_type, start_node_key=start_node_key, end_node_key=end_node_key)
+        for rel_type, triples in (by_id or {}).items():
+            rows, with_properties = relationship_rows(triples)
+            tx.run(relationship_by_id_query(rel_type, with_properties), rows=rows)
+        self.graph.commit(tx)
+
+    def close(self):
+        pass
+
+
+class DriverBackend:
+    """Écriture via le driver officiel neo4j, requêtes UNWIND réutilisables."""
+
+    def __init__(self, uri, auth, database=None):
+        # Import local : le driver n'est requis que si ce backend est choisi
+        from neo4j import GraphDatabase
+
+        self.driver = GraphDatabase.driver(uri, auth=auth)
+        self.database = database
+
+    def run(self, query, **params):
+        with self.driver.session(database=self.database) as session:
+            session.run(query, params).consume()
+
+    def evaluate(self, query, **params):
+        with self.driver.session(database=self.database) as session:
+            record = session.run(query, params).single()
+            return record[0] if record else None
+
+    def data(self, query, **params):
+        with self.driver.session(database=self.database) as session:
+            return session.run(query, params).data()
+
+    def run_system(self, query):
+        with self.driver.session(database="system") as session:
+            session.run(query).consume()
+
+    def create_nodes(self, label, keys, rows):
+        query = node_query(label, tuple(keys))
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(lambda tx: tx.run(query, rows=rows).consume())
+
+    def create_nodes_returning_ids(self, label, keys, rows):
+        query = node_query(label, tuple(keys), True)
+        with self.driver.session(database=self.database) as session:
+            return session.execute_write(lambda tx: [tuple(values) for values in tx.run(query, rows=rows).values()])
+
+    def create_relationships(self, by_type, start_node_key, end_node_key, by_id=None):
+        work = []
+        for rel_type, triples in by_type.items():
+            rows, with_properties = relationship_rows(triples)
+            work.append((relationship_query(rel_type, start_node_key, end_node_key, with_properties), rows))
+        for rel_type, triples in (by_id or {}).items():
+            rows, with_properties = relationship_rows(triples)
+            work.append((relationship_by_id_query(rel_type, with_properties), rows))
+
+        def write(tx):
+            for query, rows in work:
+                tx.run(query, rows=rows).consume()
+
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(write)
+
+    def close(self):
+        self.driver.close()
+
+
+BACKENDS = {"py2neo": Py2neoBackend, "driver": DriverBackend}
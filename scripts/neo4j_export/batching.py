@@ -0,0 +1,140 @@
+"""
+Taille de lot adaptative et reprise des lots en échec.
+
+La taille des lots lus dans SQL Server est ajustée à chaque écriture selon
+la latence mesurée de la validation dans Neo4j : elle augmente tant que les
+lots sont validés nettement sous la latence cible et diminue au-delà, ou
+après une erreur (mémoire de transaction dépassée, timeout...).
+
+Un lot en échec est coupé en deux et chaque moitié est réessayée, jusqu'à
+isoler les lignes fautives ; celles-ci sont écrites dans un fichier de
+lettres mortes (JSON lines) au lieu d'être perdues.
+
+Les erreurs transitoires de Neo4j (deadlock entre deux transactions qui
+verrouillent les mêmes nœuds, leader indisponible...) ne viennent pas du lot :
+elles sont réessayées telles quelles par retrying avant tout découpage.
+"""
+
+import json
+import threading
+import time
+
+
+class AdaptiveBatcher:
+    """Taille de lot ajustée selon la latence des validations."""
+
+    def __init__(self, initial=10000, minimum=100, maximum=100000, target_latency=2.0):
+        """
+        Args:
+            initial (int): Taille de départ
+            minimum (int): Taille minimale
+            maximum (int): Taille maximale
+            target_latency (float): Durée visée d'une validation, en secondes
+        """
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        """Retourne la taille du prochain lot."""
+        return self.size
+
+    def success(self, rows, seconds):
+        """Ajuste la taille après un lot de rows lignes validé en seconds secondes."""
+        if rows < self.size // 2:
+            # Dernier lot d'une table ou moitié d'un lot coupé : peu représentatif
+            return
+        with self._lock:
+            if seconds < self.target_latency / 2:
+                self.size = min(self.maximum, int(self.size * 1.25))
+            elif seconds > self.target_latency:
+                self.size = max(self.minimum, int(self.size * 0.7))
+
+    def failure(self):
+        """Divise la taille par deux après un échec."""
+        with self._lock:
+            self.size = max(self.minimum, self.size // 2)
+
+
+class DeadLetterFile:
+    """Fichier JSON lines des lignes n'ayant pas pu être écrites."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def write(self, table, rows, error):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    record = {"table": table, "row": list(row), "error": str(error)}
+                    f.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+            self.count += len(rows)
+
+
+def write_with_split(write_batch, rows, on_dead_rows, min_rows=1):
+    """
+    Écrit un lot en le coupant en deux à chaque échec.
+
+    Args:
+        write_batch (callable): Fonction écrivant une liste de lignes
+        rows (list): Lot à écrire
+        on_dead_rows (callable): Appelée avec (lignes, erreur) pour les lignes abandonnées
+        min_rows (int): Taille en dessous de laquelle un lot n'est plus coupé
+
+    Returns:
+        tuple: (lignes écrites, lignes abandonnées, nombre de tentatives en échec)
+    """
+    try:
+        write_batch(rows)
+        return len(rows), 0, 0
+    except Exception as error:
+        if len(rows) <= min_rows:
+            on_dead_rows(rows, error)
+            return 0, len(rows), 1
+        middle = len(rows) // 2
+        written, dead, retries = 0, 0, 1
+        for half in (rows[:middle], rows[middle:]):
+            w, d, r = write_with_split(write_batch, half, on_dead_rows, min_rows)
+            written += w
+            dead += d
+            retries += r
+        return written, dead, retries
+
+
+def is_transient(error):
+    """
+    Erreur de Neo4j qu'il suffit de réessayer.
+
+    py2neo et le pilote officiel lèvent chacun leur propre TransientError ;
+    le code Neo.TransientError.* figure aussi dans le message.
+    """
+    if any(cls.__name__ == "TransientError" for cls in type(error).__mro__):
+        return True
+    return "TransientError" in str(error) or "DeadlockDetected" in str(error)
+
+
+def retrying(write_batch, attempts=5, delay=0.1):
+    """
+    Enveloppe une fonction d'écriture : les erreurs transitoires sont réessayées.
+
+    Le lot est réécrit en entier, ce qui suppose qu'une tentative en échec
+    n'a rien validé (une transaction par appel).
+
+    Args:
+        write_batch (callable): Fonction écrivant une liste de lignes
+        attempts (int): Nombre maximal de tentatives
+        delay (float): Attente avant la deuxième tentative, doublée ensuite
+    """
+    def write(rows):
+        for attempt in range(attempts):
+            try:
+                return write_batch(rows)
+            except Exception as error:
+                if attempt == attempts - 1 or not is_transient(error):
+                    raise
+                time.sleep(delay * 2 ** attempt)
+    return write
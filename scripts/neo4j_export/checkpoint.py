@@ -0,0 +1,183 @@
+"""
+Reprise d'un export interrompu.
+
+Chaque table est lue par pagination sur la clé (keyset) :
+    SELECT TOP (n) WITH TIES ... WHERE idFilm > ? ORDER BY idFilm
+WITH TIES complète le lot avec toutes les lignes ayant la même clé que la
+dernière : une clé n'est jamais coupée entre deux lots, ce qui rend la
+reprise exacte même sur tJob où idFilm n'est pas unique.
+
+Après chaque lot validé dans Neo4j, la dernière clé lue est enregistrée dans
+un fichier d'état JSON local. Au redémarrage, la lecture repart après cette
+clé. Un lot validé dans Neo4j juste avant un arrêt brutal, mais pas encore
+enregistré (coupure réseau pendant l'accusé de validation...), est relu à
+la reprise :
+- pour les nœuds, la contrainte d'unicité ferait échouer sa réécriture à
+  chaque reprise : skip_replayed retire des premiers lots repris les clés
+  déjà présentes dans le graphe ;
+- pour les relations, CREATE doublerait chaque relation du lot :
+  replace_replayed supprime d'abord les relations déjà présentes vers les
+  films des premiers lots repris. WITH TIES garde toutes les lignes d'un
+  idFilm dans un même lot, un film est donc toujours réécrit en entier.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class CheckpointStore:
+    """Fichier d'état contenant la progression de chaque table."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Chemin du fichier d'état JSON
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.state = json.loads(self.path.read_text())
+        else:
+            self.state = {}
+
+    @property
+    def resuming(self):
+        """True si un export précédent a laissé un état à reprendre."""
+        return bool(self.state)
+
+    def table(self, table):
+        """
+        Retourne l'état d'une table.
+
+        Returns:
+            dict: {"last_key": ..., "count": int, "done": bool}
+        """
+        return self.state.get(table, {"last_key": None, "count": 0, "done": False})
+
+    def record(self, table, last_key, rows):
+        """Enregistre un lot validé : rows lignes, jusqu'à la clé last_key incluse."""
+        with self._lock:
+            entry = self.table(table)
+            self.state[table] = {"last_key": last_key, "count": entry["count"] + rows, "done": False}
+            self._save()
+
+    def done(self, table):
+        """Marque une table comme entièrement exportée."""
+        with self._lock:
+            self.state[table] = dict(self.table(table), done=True)
+            self._save()
+
+    def clear(self):
+        """Supprime le fichier d'état à la fin d'un export complet."""
+        with self._lock:
+            self.state = {}
+            if self.path.exists():
+                self.path.unlink()
+
+    def _save(self):
+        # Écriture atomique : un arrêt pendant l'écriture ne corrompt pas l'état
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.path)
+
+
+def keyset_batches(cursor, query, key, key_index, batch_size, after=None):
+    """
+    Lit une requête par pagination sur la clé.
+
+    Args:
+        cursor (pyodbc.Cursor): Curseur SQL Server
+        query (str): Requête "SELECT colonnes FROM table" sans ORDER BY
+        key (str): Colonne de pagination
+        key_index (int): Position de la colonne de pagination dans une ligne
+        batch_size (int | callable): Nombre minimal de lignes par lot (WITH TIES peut
+            en ajouter), ou fonction le retournant
+        after: Dernière clé déjà exportée, None pour partir du début
+
+    Yields:
+        list: Lot de lignes triées par clé
+    """
+    paged = query.replace("SELECT", "SELECT TOP (?) WITH TIES", 1)
+    keyword = " AND " if " WHERE " in query.upper() else " WHERE "
+    while True:
+        size = batch_size() if callable(batch_size) else batch_size
+        if after is None:
+            cursor.execute(f"{paged} ORDER BY {key}", (size,))
+        else:
+            cursor.execute(f"{paged}{keyword}{key} > ? ORDER BY {key}", (size, after))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        yield rows
+        after = rows[-1][key_index]
+
+
+def skip_replayed(data, label, key, write_batch):
+    """
+    Enveloppe une fonction d'écriture de nœuds pour la reprise d'un export.
+
+    Les clés de chaque lot sont cherchées dans le graphe et les nœuds déjà
+    présents ne sont pas recréés. Les lots étant lus dans l'ordre des clés,
+    la recherche s'arrête au premier lot dont aucune clé n'existe : seuls les
+    lots qui suivent immédiatement le point de reprise coûtent une requête.
+
+    Args:
+        data (callable): Exécute une requête et retourne des dictionnaires, ex. backend.data
+        label (str): Label des nœuds écrits
+        key (str): Propriété clé (colonne 0 des lignes)
+        write_batch (callable): Fonction écrivant une liste de lignes
+    """
+    query = f"UNWIND $keys AS key MATCH (n:{label} {{{key}: key}}) RETURN key"
+    checking = True
+
+    def write(rows):
+        nonlocal checking
+        if checking:
+            existing = {record["key"] for record in data(query, keys=[row[0] for row in rows])}
+            if existing:
+                print(f"{len(existing)} {label} nodes already written before the interruption, skipped")
+                rows = [row for row in rows if row[0] not in existing]
+                if not rows:
+                    return
+            else:
+                checking = False
+        write_batch(rows)
+    return write
+
+
+def replace_replayed(evaluate, write_batch, category=1, end=2):
+    """
+    Enveloppe une fonction d'écriture de relations pour la reprise d'un export.
+
+    Avant chaque lot, les relations des types du lot arrivant aux films du
+    lot sont supprimées, puis le lot est écrit : un lot déjà validé avant
+    l'arrêt est remplacé au lieu d'être doublé. Seuls les types présents
+    dans le lot sont touchés, les étapes par catégorie exécutées en parallèle
+    ne suppriment pas les relations les unes des autres. Comme pour
+    skip_replayed, la suppression s'arrête au premier lot qui n'en trouve
+    aucune.
+
+    Args:
+        evaluate (callable): Exécute une requête et retourne la première valeur, ex. backend.evaluate
+        write_batch (callable): Fonction écrivant une liste de lignes (idArtist, category, idFilm, ...)
+        category (int): Position de la catégorie dans une ligne
+        end (int): Position de l'identifiant du film dans une ligne
+    """
+    query = ("UNWIND $films AS key MATCH (:Artist)-[r]->(:Film {idFilm: key}) "
+             "WHERE type(r) IN $types DELETE r RETURN count(r)")
+    checking = True
+
+    def write(rows):
+        nonlocal checking
+        if checking:
+            films = list({row[end] for row in rows})
+            types = list({row[category].replace(" ", "_").upper() for row in rows if row[category] is not None})
+            deleted = evaluate(query, films=films, types=types)
+            if deleted:
+                print(f"{deleted} relationships already written before the interruption, replaced")
+            else:
+                checking = False
+        write_batch(rows)
+    return write
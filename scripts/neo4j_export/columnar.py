@@ -0,0 +1,221 @@
+"""
+Lots en colonnes typées à partir des lignes pyodbc.
+
+Un lot de lignes pyodbc (objets Row) est transposé en une colonne NumPy
+par attribut :
+- entiers et Decimal sans partie fractionnaire -> int64 ;
+- Decimal fractionnaires et flottants -> float64 ;
+- chaînes -> tableau d'objets, ou codage par dictionnaire pour les
+  colonnes de faible cardinalité (category : 4 valeurs pour des millions de
+  lignes) : un tableau de codes int32 et la liste des valeurs distinctes ;
+- NULL -> masque booléen à côté des valeurs (None si aucune valeur nulle).
+
+Le choix du codage par dictionnaire est fait sur le premier lot et conservé
+ensuite ; le dictionnaire est partagé par tous les lots d'une lecture, les
+codes restent donc comparables d'un lot à l'autre.
+
+ColumnBatch se comporte aussi comme une liste de lignes (len, indice,
+itération) : les étapes qui travaillent ligne à ligne l'acceptent telles
+quelles, tandis que transform.node_params et transform.relationship_params
+exploitent directement les colonnes.
+
+Ce n'est pas un chemin plus rapide : --columnar est plus lent que
+--fast-path (environ deux fois sur la préparation des Film et des tJob,
+voir benchmarks/bench_transform.py). pyodbc livre des objets Python, la
+transposition se fait valeur par valeur, et Neo4j attend de nouveau des
+listes Python : node_params redéfait les colonnes, et les étapes ligne à
+ligne (clés compactes, fusion des doublons, orphelins, degrés, reprise)
+reconstruisent les tuples par ColumnBatch.rows(). L'intérêt est le format
+(codage par dictionnaire, to_arrow), pas le débit.
+
+NumPy est requis ; pyarrow seulement pour ColumnBatch.to_arrow.
+"""
+
+import decimal
+
+# Au-delà de cette proportion de valeurs distinctes, une colonne de chaînes n'est pas codée par dictionnaire
+DICTIONARY_THRESHOLD = 0.05
+
+
+class Column:
+    """Valeurs NumPy et masque des NULL (None si la colonne n'en contient pas)."""
+
+    def __init__(self, values, mask=None):
+        self.values = values
+        self.mask = mask
+
+    def to_list(self):
+        values = self.values.tolist()
+        if self.mask is None:
+            return values
+        return [None if null else value for value, null in zip(values, self.mask.tolist())]
+
+
+class DictionaryColumn:
+    """Codes int32 (-1 pour NULL) dans un dictionnaire de valeurs distinctes."""
+
+    def __init__(self, codes, dictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    @property
+    def mask(self):
+        mask = self.codes < 0
+        return mask if mask.any() else None
+
+    def decoded(self):
+        import numpy as np
+
+        # Le code -1 désigne le dernier élément : None
+        return np.array(self.dictionary + [None], dtype=object)[self.codes]
+
+    def to_list(self):
+        return self.decoded().tolist()
+
+
+class ColumnBatch:
+    """Lot de lignes stocké par colonnes."""
+
+    def __init__(self, names, columns, length):
+        self.names = names
+        self.columns = columns
+        self.length = length
+        self._rows = None
+
+    def __len__(self):
+        return self.length
+
+    def rows(self):
+        """Lignes (tuples), calculées une seule fois."""
+        if self._rows is None:
+            self._rows = list(zip(*(column.to_list() for column in self.columns)))
+        return self._rows
+
+    def __getitem__(self, index):
+        return self.rows()[index]
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def to_lists(self):
+        """Lignes en listes de valeurs (format de create_nodes avec keys=...)."""
+        return [list(row) for row in zip(*(column.to_list() for column in self.columns))]
+
+    def to_arrow(self):
+        """RecordBatch Arrow (les colonnes codées deviennent des DictionaryArray)."""
+        import pyarrow as pa
+
+        arrays = []
+        for column in self.columns:
+            if isinstance(column, DictionaryColumn):
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(column.codes, mask=column.codes < 0), pa.array(column.dictionary)))
+            else:
+                arrays.append(pa.array(column.values, mask=column.mask,
+                                       from_pandas=column.values.dtype == object))
+        return pa.RecordBatch.from_arrays(arrays, names=list(self.names))
+
+
+class ColumnarReader:
+    """Convertit les lots d'une même lecture en ColumnBatch."""
+
+    def __init__(self, names=None, dictionary_threshold=DICTIONARY_THRESHOLD):
+        """
+        Args:
+            names (list): Noms des colonnes (c0, c1... par défaut)
+            dictionary_threshold (float): Proportion maximale de valeurs distinctes pour le codage par dictionnaire
+        """
+        # Import local : NumPy n'est requis que pour le chemin en colonnes
+        import numpy as np
+
+        self.np = np
+        self.names = names
+        self.dictionary_threshold = dictionary_threshold
+        # Position -> (dictionnaire, index valeur -> code), décidé au premier lot
+        self.dictionaries = None
+
+    def _null_mask(self, values):
+        mask = self.np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+        return mask if mask.any() else None
+
+    def _column(self, values):
+        np = self.np
+        sample = next((value for value in values if value is not None), None)
+        mask = self._null_mask(values)
+        count = len(values)
+        if sample is None:
+            return Column(np.full(count, None, dtype=object), mask)
+        if isinstance(sample, bool):
+            return Column(np.fromiter((bool(v) for v in values), dtype=bool, count=count), mask)
+        if isinstance(sample, (int, decimal.Decimal)):
+            if all(v is None or v == int(v) for v in values):
+                return Column(np.fromiter((0 if v is None else int(v) for v in values), dtype=np.int64, count=count), mask)
+            return Column(np.fromiter((np.nan if v is None else float(v) for v in values), dtype=np.float64, count=count), mask)
+        if isinstance(sample, float):
+            return Column(np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=count), mask)
+        return Column(np.array(values, dtype=object), mask)
+
+    def _encode(self, values, dictionary, lookup):
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(dictionary)
+                dictionary.append(value)
+            codes.append(code)
+        return DictionaryColumn(self.np.array(codes, dtype=self.np.int32), dictionary)
+
+    def convert(self, rows):
+        """Transpose une liste de lignes en ColumnBatch."""
+        if not rows:
+            return ColumnBatch(self.names or [], [], 0)
+        values_by_column = [list(values) for values in zip(*rows)]
+        names = self.names or [f"c{i}" for i in range(len(values_by_column))]
+
+        if self.dictionaries is None:
+            self.dictionaries = {}
+            for i, values in enumerate(values_by_column):
+                strings = [value for value in values if value is not None]
+                if strings and isinstance(strings[0], str) and \
+                        len(set(strings)) <= self.dictionary_threshold * len(strings):
+                    self.dictionaries[i] = ([], {})
+
+        columns = []
+        for i, values in enumerate(values_by_column):
+            if i in self.dictionaries:
+                columns.append(self._encode(values, *self.dictionaries[i]))
+            else:
+                columns.append(self._column(values))
+        return ColumnBatch(names, columns, len(rows))
+
+
+def columnar_batches(batches, names=None):
+    """Convertit un flux de lots de lignes en flux de ColumnBatch."""
+    reader = ColumnarReader(names)
+    for rows in batches:
+        yield reader.convert(rows)
+
+
+def fetch_columnar(cursor, batch_size, names=None):
+    """
+    Lit un curseur déjà exécuté par lots en colonnes.
+
+    Args:
+        cursor (pyodbc.Cursor): Curseur sur lequel execute() a été appelé
+        batch_size (int | callable): Nombre de lignes par lot, ou fonction le retournant
+        names (list): Noms des colonnes (cursor.description par défaut)
+
+    Yields:
+        ColumnBatch: Lots de lignes en colonnes
+    """
+    if names is None and cursor.description:
+        names = [column[0] for column in cursor.description]
+    reader = ColumnarReader(names)
+    while True:
+        rows = cursor.fetchmany(batch_size() if callable(batch_size) else batch_size)
+        if not rows:
+            break
+        yield reader.convert(rows)
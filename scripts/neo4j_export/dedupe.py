@@ -0,0 +1,104 @@
+"""
+Fusion des lignes de tJob en double.
+
+Plusieurs lignes de tJob peuvent porter le même triplet
+(idArtist, category, idFilm) : plusieurs personnages, plusieurs crédits...
+Au lieu de créer une relation parallèle par ligne, chaque triplet devient
+une seule relation portant une propriété count.
+
+Le comptage se fait en mémoire tant que le nombre de triplets distincts
+reste sous max_memory. Au-delà, les comptes sont triés et déversés sur
+disque par séries (tri externe), puis les séries sont fusionnées
+(heapq.merge) en additionnant les comptes des triplets identiques.
+spill_run et merge_runs servent aussi à degrees.DegreeCounter.
+"""
+
+import heapq
+import operator
+import os
+import pickle
+import tempfile
+from collections import Counter
+
+# Nombre d'entrées écrites par appel à pickle.dump dans une série
+_CHUNK = 10000
+
+
+def spill_run(counts, directory, prefix="tjob-run-"):
+    """Écrit une série triée de (clé, valeur) et retourne son chemin."""
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".pickle", dir=directory)
+    items = sorted(counts.items())
+    with os.fdopen(fd, "wb") as f:
+        for i in range(0, len(items), _CHUNK):
+            pickle.dump(items[i:i + _CHUNK], f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                break
+            yield from chunk
+
+
+def merge_runs(paths, combine=operator.add):
+    """Fusionne des séries triées en combinant (par défaut, en additionnant) les valeurs d'une même clé."""
+    current, total = None, 0
+    for key, count in heapq.merge(*(_read_run(path) for path in paths)):
+        if key == current:
+            total = combine(total, count)
+            continue
+        if current is not None:
+            yield current, total
+        current, total = key, count
+    if current is not None:
+        yield current, total
+
+
+def collapse_duplicates(batches, batch_size, max_memory=1000000, directory=None):
+    """
+    Regroupe les lignes (idArtist, category, idFilm) identiques.
+
+    Toutes les lignes sont lues avant que le premier lot ne soit produit.
+
+    Args:
+        batches (iterable): Lots de lignes (idArtist, category, idFilm)
+        batch_size (int): Nombre de lignes par lot produit
+        max_memory (int): Nombre de triplets distincts gardés en mémoire avant déversement
+        directory (str): Dossier des séries temporaires (dossier temporaire système par défaut)
+
+    Yields:
+        list: Lots de tuples (idArtist, category, idFilm, count)
+    """
+    counts = Counter()
+    runs = []
+    try:
+        for rows in batches:
+            for row in rows:
+                counts[(row[0], row[1], row[2])] += 1
+            if len(counts) >= max_memory:
+                runs.append(spill_run(counts, directory))
+                counts = Counter()
+
+        if runs:
+            if counts:
+                runs.append(spill_run(counts, directory))
+                counts = Counter()
+            items = merge_runs(runs)
+        else:
+            items = iter(counts.items())
+
+        batch = []
+        for (idArtist, category, idFilm), count in items:
+            batch.append((idArtist, category, idFilm, count))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        for path in runs:
+            os.remove(path)
@@ -0,0 +1,161 @@
+"""
+Propriétés d'agrégats calculées pendant l'export des relations.
+
+Les requêtes habituelles du TP sont des agrégations sur tJob (film ayant le
+plus d'acteurs, artistes ayant plusieurs films ou plusieurs
+responsabilités) : en Cypher, chacune parcourt toutes les relations.
+DegreeCounter observe les lots de relations au moment où ils sont écrits
+et, une fois toutes les relations exportées, pose sur les nœuds :
+- Film : actorCount (acteurs distincts), artistCount (artistes distincts) ;
+- Artist : filmCount (films distincts), categoryMask (un bit par
+  catégorie, voir CATEGORY_BITS), categoryCount (nombre de catégories),
+  multiRoleFilmCount (films où l'artiste a plusieurs catégories).
+
+Des index sur actorCount, filmCount, categoryCount et multiRoleFilmCount
+font de ces questions de simples lectures d'index, par exemple :
+    MATCH (f:Film) WHERE f.actorCount IS NOT NULL
+    RETURN f ORDER BY f.actorCount DESC LIMIT 1
+    MATCH (a:Artist) WHERE a.categoryCount > 1 RETURN a
+
+Un nœud sans crédit n'a pas ces propriétés (équivalent à 0). Les couples
+(artiste, film) distincts sont gardés en mémoire jusqu'à max_memory, puis
+déversés sur disque en séries triées comme dans dedupe.py ; la fusion des
+séries, triée par artiste, ne garde en mémoire qu'une entrée par film et
+par artiste.
+"""
+
+import operator
+import os
+import threading
+
+from .dedupe import merge_runs, spill_run
+
+# Bits de categoryMask des catégories connues ; les autres prennent les bits suivants dans l'ordre d'apparition
+CATEGORY_BITS = {"acted in": 1, "directed": 2, "produced": 4, "composed": 8}
+ACTOR_CATEGORY = "acted in"
+
+# Propriétés indexées, par label
+PROPERTY_INDEXES = [
+    ("Film", "actorCount"),
+    ("Artist", "filmCount"),
+    ("Artist", "categoryCount"),
+    ("Artist", "multiRoleFilmCount"),
+]
+
+FILM_QUERY = ("UNWIND $rows AS row MATCH (f:Film {idFilm: row[0]}) "
+              "SET f.actorCount = row[1], f.artistCount = row[2]")
+ARTIST_QUERY = ("UNWIND $rows AS row MATCH (a:Artist {idArtist: row[0]}) "
+                "SET a.filmCount = row[1], a.categoryMask = row[2], a.categoryCount = row[3], "
+                "a.multiRoleFilmCount = row[4]")
+
+
+def property_index_query(label, prop):
+    """Requête idempotente de création d'un index sur une propriété d'agrégat."""
+    return f"CREATE INDEX {label.lower()}_{prop.lower()} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+
+
+class DegreeCounter:
+    """Catégories de chaque couple (artiste, film) des relations écrites."""
+
+    def __init__(self, max_memory=1000000, directory=None):
+        """
+        Args:
+            max_memory (int): Nombre de couples (artiste, film) gardés en mémoire avant déversement
+            directory (str): Dossier des séries temporaires (dossier temporaire système par défaut)
+        """
+        self.bits = dict(CATEGORY_BITS)
+        # (idArtist, idFilm) -> masque des catégories
+        self.pairs = {}
+        self.max_memory = max_memory
+        self.directory = directory
+        self.runs = []
+        self._lock = threading.Lock()
+
+    def _bit(self, category):
+        bit = self.bits.get(category)
+        if bit is None:
+            bit = self.bits[category] = 1 << len(self.bits)
+        return bit
+
+    def add(self, rows):
+        """Ajoute un lot de lignes (idArtist, category, idFilm[, count])."""
+        with self._lock:
+            pairs = self.pairs
+            for row in rows:
+                if row[1] is None:
+                    # Pas de catégorie : aucune relation créée
+                    continue
+                key = (row[0], row[2])
+                pairs[key] = pairs.get(key, 0) | self._bit(row[1])
+            if len(pairs) >= self.max_memory:
+                self.runs.append(spill_run(pairs, self.directory, prefix="degree-run-"))
+                self.pairs = {}
+
+    def counting(self, write_batch):
+        """Enveloppe une fonction d'écriture de relations : les lignes sont comptées une fois le lot écrit."""
+        def write(rows):
+            write_batch(rows)
+            self.add(rows)
+        return write
+
+    def properties(self):
+        """
+        Agrégats par nœud.
+
+        Returns:
+            tuple: (lignes [idFilm, actorCount, artistCount],
+                    lignes [idArtist, filmCount, categoryMask, categoryCount, multiRoleFilmCount])
+        """
+        actor = self.bits[ACTOR_CATEGORY]
+        films = {}
+        artists = {}
+        with self._lock:
+            if self.runs:
+                if self.pairs:
+                    self.runs.append(spill_run(self.pairs, self.directory, prefix="degree-run-"))
+                    self.pairs = {}
+                # Un même couple peut figurer dans plusieurs séries : ses masques sont réunis
+                pairs = merge_runs(self.runs, operator.or_)
+            else:
+                pairs = self.pairs.items()
+            for (artist, film), mask in pairs:
+                counts = films.setdefault(film, [0, 0])
+                counts[0] += 1 if mask & actor else 0
+                counts[1] += 1
+                counts = artists.setdefault(artist, [0, 0, 0])
+                counts[0] += 1
+                counts[1] |= mask
+                # Plus d'un bit : plusieurs responsabilités dans ce film
+                counts[2] += 1 if mask & (mask - 1) else 0
+        return ([[film, actors, total] for film, (actors, total) in films.items()],
+                [[artist, count, mask, bin(mask).count("1"), multi] for artist, (count, mask, multi) in artists.items()])
+
+    def write(self, run, batch_size):
+        """
+        Pose les propriétés d'agrégats sur les nœuds et crée leurs index.
+
+        Args:
+            run (callable): Exécute une requête en auto-commit, ex. backend.run
+            batch_size (int): Nombre de nœuds mis à jour par requête
+
+        Returns:
+            tuple: (films mis à jour, artistes mis à jour)
+        """
+        films, artists = self.properties()
+        for query, rows in ((FILM_QUERY, films), (ARTIST_QUERY, artists)):
+            for i in range(0, len(rows), batch_size):
+                run(query, rows=rows[i:i + batch_size])
+        for label, prop in PROPERTY_INDEXES:
+            run(property_index_query(label, prop))
+        return len(films), len(artists)
+
+    def close(self):
+        """Supprime les séries déversées sur disque."""
+        with self._lock:
+            for path in self.runs:
+                os.remove(path)
+            self.runs = []
+
+    def legend(self):
+        """Correspondance bit -> catégorie de categoryMask."""
+        return ", ".join(f"{bit}={category}" for category, bit in sorted(self.bits.items(), key=lambda item: item[1]))
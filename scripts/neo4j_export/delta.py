@@ -0,0 +1,251 @@
+"""
+Synchronisation incrémentale SQL Server -> Neo4j.
+
+Seules les lignes insérées, modifiées ou supprimées depuis la dernière
+synchronisation sont appliquées au graphe :
+- si le change tracking SQL Server est activé sur la table et que la
+  version enregistrée est encore valide, CHANGETABLE(CHANGES ...) donne
+  directement les clés modifiées ;
+- sinon, SQL Server calcule un hash par ligne (HASHBYTES) et seuls les
+  couples (clé, hash) transitent ; ils sont comparés à un instantané local
+  (fichier SQLite) pour en déduire les changements.
+
+Pour tJob, qui peut contenir plusieurs fois le même triplet
+(idArtist, category, idFilm), l'instantané stocke le nombre d'occurrences
+de chaque triplet. Pour chaque triplet modifié, le nombre de relations
+parallèles dans Neo4j est ramené à ce nombre.
+
+L'instantané est validé après chaque lot appliqué dans Neo4j : en cas
+d'arrêt, la synchronisation suivante reprend les changements restants.
+"""
+
+import sqlite3
+
+from .pipeline import fetch_batches
+
+# Nombre maximal de clés dans une clause IN (SQL Server limite à 2100 paramètres)
+IN_CHUNK = 1000
+
+
+class NodeTable:
+    """Description d'une table SQL exportée en nœuds Neo4j."""
+
+    def __init__(self, table, label, key, columns):
+        """
+        Args:
+            table (str): Nom de la table SQL
+            label (str): Label des nœuds Neo4j
+            key (str): Colonne clé, également propriété clé des nœuds
+            columns (list): Autres colonnes exportées en propriétés
+        """
+        self.table = table
+        self.label = label
+        self.key = key
+        self.columns = columns
+
+    @property
+    def hash_expr(self):
+        """Expression SQL du hash d'une ligne (hexadécimal)."""
+        parts = ", '|', ".join(f"CAST({c} AS NVARCHAR(MAX))" for c in [self.key] + self.columns)
+        return f"CONVERT(VARCHAR(64), HASHBYTES('SHA2_256', CONCAT({parts})), 2)"
+
+    @property
+    def upsert_query(self):
+        assignments = ", ".join(f"n.{c} = row.{c}" for c in self.columns)
+        return f"UNWIND $rows AS row MERGE (n:{self.label} {{{self.key}: row.{self.key}}}) SET {assignments}"
+
+    @property
+    def delete_query(self):
+        return f"UNWIND $keys AS k MATCH (n:{self.label} {{{self.key}: k}}) DETACH DELETE n"
+
+
+class SnapshotStore:
+    """Instantané local des hashes de lignes et des versions de change tracking."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Chemin du fichier SQLite
+        """
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS versions (tbl TEXT PRIMARY KEY, version INTEGER)")
+
+    def _ensure(self, table, width):
+        keys = ", ".join(f"k{i}" for i in range(width))
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS snap_{table} ({keys}, h, PRIMARY KEY ({keys}))")
+
+    def get_version(self, table):
+        row = self.conn.execute("SELECT version FROM versions WHERE tbl = ?", (table,)).fetchone()
+        return row[0] if row else None
+
+    def set_version(self, table, version):
+        self.conn.execute("INSERT OR REPLACE INTO versions VALUES (?, ?)", (table, version))
+        self.conn.commit()
+
+    def diff(self, table, width, batches):
+        """
+        Compare l'état courant d'une table à l'instantané.
+
+        Args:
+            table (str): Nom de la table
+            width (int): Nombre de colonnes de la clé
+            batches (iterable): Lots de lignes (clé..., hash)
+
+        Returns:
+            list: Tuples (clé..., nouveau hash ou None si supprimée, ancien hash ou None)
+        """
+        self._ensure(table, width)
+        keys = [f"k{i}" for i in range(width)]
+        columns = ", ".join(keys)
+        join = " AND ".join(f"i.{k} = s.{k}" for k in keys)
+        self.conn.execute("DROP TABLE IF EXISTS temp.incoming")
+        self.conn.execute(f"CREATE TEMP TABLE incoming ({columns}, h, PRIMARY KEY ({columns}))")
+        placeholders = ", ".join("?" * (width + 1))
+        for rows in batches:
+            self.conn.executemany(f"INSERT INTO incoming VALUES ({placeholders})", [tuple(r) for r in rows])
+        changes = self.conn.execute(f"""
+            SELECT {", ".join("i." + k for k in keys)}, i.h, s.h
+            FROM incoming i LEFT JOIN snap_{table} s ON {join}
+            WHERE s.h IS NULL OR s.h <> i.h
+            UNION ALL
+            SELECT {", ".join("s." + k for k in keys)}, NULL, s.h
+            FROM snap_{table} s LEFT JOIN incoming i ON {join}
+            WHERE i.k0 IS NULL
+            """).fetchall()
+        self.conn.execute("DROP TABLE temp.incoming")
+        return changes
+
+    def apply(self, table, width, changes):
+        """
+        Enregistre des changements appliqués dans Neo4j et valide l'instantané.
+
+        Args:
+            changes (list): Tuples (clé..., hash) ; hash None = ligne supprimée
+        """
+        self._ensure(table, width)
+        where = " AND ".join(f"k{i} = ?" for i in range(width))
+        placeholders = ", ".join("?" * (width + 1))
+        for change in changes:
+            if change[-1] is None:
+                self.conn.execute(f"DELETE FROM snap_{table} WHERE {where}", change[:-1])
+            else:
+                self.conn.execute(f"INSERT OR REPLACE INTO snap_{table} VALUES ({placeholders})", change)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def change_tracking_versions(cursor, table):
+    """
+    Retourne (version courante, version minimale valide) du change tracking,
+    ou None si le change tracking n'est pas activé sur la table.
+    """
+    cursor.execute("""
+        SELECT CHANGE_TRACKING_CURRENT_VERSION(), CHANGE_TRACKING_MIN_VALID_VERSION(t.object_id)
+        FROM sys.change_tracking_tables t
+        WHERE t.object_id = OBJECT_ID(?)
+        """, (table,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def sync_nodes(cursor, store, spec, run, batch_size):
+    """
+    Applique à Neo4j les changements d'une table de nœuds.
+
+    Args:
+        cursor (pyodbc.Cursor): Curseur SQL Server
+        store (SnapshotStore): Instantané local
+        spec (NodeTable): Table à synchroniser
+        run (callable): Exécute une requête Cypher, ex. graph.run
+        batch_size (int): Nombre de nœuds par transaction
+
+    Returns:
+        tuple: (nombre de nœuds créés ou modifiés, nombre de nœuds supprimés)
+    """
+    versions = change_tracking_versions(cursor, spec.table)
+    last = store.get_version(spec.table)
+    if versions and last is not None and last >= versions[1]:
+        cursor.execute(f"""
+            SELECT CT.{spec.key}, CT.SYS_CHANGE_OPERATION
+            FROM CHANGETABLE(CHANGES {spec.table}, ?) AS CT
+            """, (last,))
+        changed = cursor.fetchall()
+        upserts = [row[0] for row in changed if row[1] != "D"]
+        deletes = [row[0] for row in changed if row[1] == "D"]
+    else:
+        cursor.execute(f"SELECT {spec.key}, {spec.hash_expr} FROM {spec.table}")
+        changed = store.diff(spec.table, 1, fetch_batches(cursor, batch_size))
+        upserts = [row[0] for row in changed if row[1] is not None]
+        deletes = [row[0] for row in changed if row[1] is None]
+
+    columns = ", ".join([spec.key] + spec.columns)
+    names = [spec.key] + spec.columns
+    for keys in _chunks(upserts, min(batch_size, IN_CHUNK)):
+        placeholders = ", ".join("?" * len(keys))
+        cursor.execute(f"SELECT {columns}, {spec.hash_expr} FROM {spec.table} WHERE {spec.key} IN ({placeholders})", keys)
+        rows = cursor.fetchall()
+        run(spec.upsert_query, rows=[dict(zip(names, row[:-1])) for row in rows])
+        store.apply(spec.table, 1, [(row[0], row[-1]) for row in rows])
+
+    for keys in _chunks(deletes, batch_size):
+        run(spec.delete_query, keys=keys)
+        store.apply(spec.table, 1, [(key, None) for key in keys])
+
+    if versions:
+        # Version lue avant les changements : un changement concurrent sera revu, jamais perdu
+        store.set_version(spec.table, versions[0])
+    return len(upserts), len(deletes)
+
+
+def sync_relationships(cursor, store, run, batch_size):
+    """
+    Applique à Neo4j les changements de tJob.
+
+    Returns:
+        tuple: (nombre de relations créées, nombre de relations supprimées)
+    """
+    cursor.execute("""
+        SELECT idArtist, category, idFilm, COUNT(*)
+        FROM tJob
+        GROUP BY idArtist, category, idFilm
+        """)
+    changed = store.diff("tJob", 3, fetch_batches(cursor, batch_size))
+
+    created = deleted = 0
+    for changes in _chunks(changed, batch_size):
+        targets = {}
+        for idArtist, category, idFilm, new, old in changes:
+            delta = (new or 0) - (old or 0)
+            created += max(delta, 0)
+            deleted += max(-delta, 0)
+            rel_type = category.replace(" ", "_").upper()
+            targets.setdefault(rel_type, []).append({"idArtist": idArtist, "idFilm": idFilm, "target": new or 0})
+
+        # Le graphe est ramené au nombre cible de relations, quel que soit son état :
+        # rejouer un lot ou synchroniser un graphe déjà chargé ne crée pas de doublons
+        for rel_type, rows in targets.items():
+            run(f"""
+                UNWIND $rows AS row
+                MATCH (:Artist {{idArtist: row.idArtist}})-[r:{rel_type}]->(:Film {{idFilm: row.idFilm}})
+                WITH row, collect(r) AS rels
+                FOREACH (r IN rels[row.target..] | DELETE r)
+                """, rows=rows)
+            run(f"""
+                UNWIND $rows AS row
+                MATCH (a:Artist {{idArtist: row.idArtist}})
+                MATCH (f:Film {{idFilm: row.idFilm}})
+                OPTIONAL MATCH (a)-[r:{rel_type}]->(f)
+                WITH a, f, row, count(r) AS existing
+                UNWIND range(1, row.target - existing) AS i
+                CREATE (a)-[:{rel_type}]->(f)
+                """, rows=rows)
+        store.apply("tJob", 3, [(a, c, f, new) for a, c, f, new, old in changes])
+
+    return created, deleted
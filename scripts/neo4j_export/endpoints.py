@@ -0,0 +1,147 @@
+"""
+Filtrage des relations dont une extrémité n'a pas été exportée.
+
+Une ligne de tJob qui référence un idArtist ou un idFilm absent est
+envoyée à Neo4j, dont le MATCH ne trouve rien : la relation n'est pas
+créée, sans erreur, et le serveur a travaillé pour rien. Les clés des
+nœuds écrits sont donc enregistrées dans un ensemble compact et les
+relations orphelines sont écartées côté client et consignées dans un
+rapport.
+
+Les identifiants IMDB ont la forme "tt0001234" / "nm0001234" : la partie
+numérique sert d'indice dans un bitmap (un bit par identifiant possible,
+environ 2 Mo pour 15 millions d'identifiants), tout comme les clés déjà
+entières de --compact-keys. Les clés d'une autre forme sont gardées dans
+un ensemble Python. Contrairement à un filtre de Bloom, le test est
+exact : aucune relation valide n'est écartée.
+"""
+
+import csv
+import threading
+
+
+class KeyBitmap:
+    """Ensemble de clés IMDB sous forme de bitmap sur la partie numérique."""
+
+    def __init__(self):
+        self._bits = bytearray()
+        self._prefix = None
+        self._others = set()
+        self._lock = threading.Lock()
+
+    def _index(self, key):
+        """Indice de la clé dans le bitmap, ou None si elle n'a pas la forme attendue."""
+        if isinstance(key, int) and key >= 0:
+            return key
+        if not isinstance(key, str):
+            return None
+        prefix, digits = key[:2], key[2:]
+        if not digits.isdigit() or (self._prefix is not None and prefix != self._prefix):
+            return None
+        number = int(digits)
+        # "tt001234" et "tt0001234" donneraient le même indice : seule la forme canonique va au bitmap
+        if digits != f"{number:07d}":
+            return None
+        return number
+
+    def add(self, keys):
+        with self._lock:
+            for key in keys:
+                if self._prefix is None and isinstance(key, str) and key[2:].isdigit():
+                    self._prefix = key[:2]
+                index = self._index(key)
+                if index is None:
+                    self._others.add(key)
+                    continue
+                byte = index >> 3
+                if byte >= len(self._bits):
+                    self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits))))
+                self._bits[byte] |= 1 << (index & 7)
+
+    def __contains__(self, key):
+        index = self._index(key)
+        if index is None:
+            return key in self._others
+        byte = index >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (index & 7)))
+
+
+class OrphanReport:
+    """Fichier CSV des relations écartées, avec l'extrémité manquante."""
+
+    def __init__(self, path):
+        self.path = path
+        self.missing_start = 0
+        self.missing_end = 0
+        self.missing_both = 0
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return self.missing_start + self.missing_end + self.missing_both
+
+    def write(self, row, missing):
+        # Appelée par les étapes de relations, éventuellement en parallèle
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "w", newline="", encoding="utf-8")
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(["idArtist", "category", "idFilm", "missing"])
+            self._writer.writerow([row[0], row[1], row[2], missing])
+            if missing == "both":
+                self.missing_both += 1
+            elif missing == "start":
+                self.missing_start += 1
+            else:
+                self.missing_end += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def summary(self):
+        return (f"{self.count} orphan relationships skipped "
+                f"({self.missing_start} unknown artist, {self.missing_end} unknown film, "
+                f"{self.missing_both} both), see {self.path}")
+
+
+class EndpointFilter:
+    """Clés des nœuds Artist et Film écrits, et filtrage des lots de tJob."""
+
+    def __init__(self, report):
+        """
+        Args:
+            report (OrphanReport): Rapport des relations écartées
+        """
+        self.report = report
+        self.artists = KeyBitmap()
+        self.films = KeyBitmap()
+
+    def registering(self, keys, write_batch):
+        """Enveloppe une fonction d'écriture de nœuds pour enregistrer leurs clés (colonne 0) une fois écrits."""
+        def write(rows):
+            write_batch(rows)
+            keys.add(row[0] for row in rows)
+        return write
+
+    def filter_batches(self, batches):
+        """
+        Retire des lots les lignes (idArtist, category, idFilm, ...) dont une extrémité est inconnue.
+
+        Yields:
+            list: Lots filtrés (les lots entièrement orphelins sont sautés)
+        """
+        artists, films = self.artists, self.films
+        for rows in batches:
+            kept = []
+            for row in rows:
+                has_start, has_end = row[0] in artists, row[2] in films
+                if has_start and has_end:
+                    kept.append(row)
+                else:
+                    self.report.write(row, "end" if has_start else "start" if has_end else "both")
+            if kept:
+                yield kept
@@ -0,0 +1,132 @@
+"""
+Extraction parallèle d'une table SQL Server découpée en plages de clés.
+
+La table est découpée en plages contiguës (NTILE sur la clé), chaque plage
+est lue sur sa propre connexion pyodbc dans un thread, et les lots des
+différentes plages sont fusionnés dans un seul flux. L'ordre des lots entre
+plages n'est pas garanti.
+"""
+
+import queue
+import threading
+
+# Marqueur de fin de lecture d'une plage
+_DONE = object()
+
+
+def key_ranges(cursor, table, key, parts):
+    """
+    Calcule des plages de clés de tailles comparables.
+
+    Args:
+        cursor (pyodbc.Cursor): Curseur SQL Server
+        table (str): Nom de la table
+        key (str): Colonne servant au découpage (idFilm, idArtist...)
+        parts (int): Nombre de plages souhaité
+
+    Returns:
+        list: Bornes (lo, hi) ; lo inclus, hi exclu, None = non borné
+    """
+    cursor.execute(f"""
+        SELECT MIN(k)
+        FROM (SELECT {key} AS k, NTILE(?) OVER (ORDER BY {key}) AS part FROM {table}) t
+        GROUP BY part
+        ORDER BY part
+        """, (parts,))
+    # Une même clé peut apparaître dans deux tuiles (tJob) : seules les
+    # bornes basses distinctes sont conservées pour ne lire chaque ligne qu'une fois
+    lows = []
+    for (low,) in cursor.fetchall():
+        if not lows or low != lows[-1]:
+            lows.append(low)
+    if not lows:
+        return [(None, None)]
+    lows[0] = None
+    return list(zip(lows, lows[1:] + [None]))
+
+
+def range_query(query, key, lo, hi):
+    """
+    Restreint une requête SELECT à une plage de clés.
+
+    Returns:
+        tuple: (requête SQL, paramètres)
+    """
+    conditions = []
+    params = []
+    if lo is not None:
+        conditions.append(f"{key} >= ?")
+        params.append(lo)
+    if hi is not None:
+        conditions.append(f"{key} < ?")
+        params.append(hi)
+    if not conditions:
+        return query, params
+    keyword = " AND " if " WHERE " in query.upper() else " WHERE "
+    return query + keyword + " AND ".join(conditions), params
+
+
+def read_ranges(connect, query, key, ranges, batch_size, queue_size=4):
+    """
+    Lit les plages en parallèle et fusionne leurs lots.
+
+    Args:
+        connect (callable): Fonction retournant une nouvelle connexion pyodbc
+        query (str): Requête SELECT de la table
+        key (str): Colonne de découpage
+        ranges (list): Plages produites par key_ranges
+        batch_size (int): Nombre de lignes par lot
+        queue_size (int): Nombre maximal de lots lus en avance
+
+    Yields:
+        list: Lot de lignes, toutes plages confondues
+    """
+    merged = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                merged.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read(lo, hi):
+        try:
+            sql, params = range_query(query, key, lo, hi)
+            conn = connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                while not stop.is_set():
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows or not put(rows):
+                        break
+            finally:
+                conn.close()
+        except Exception as error:
+            put(error)
+        finally:
+            put(_DONE)
+
+    threads = [threading.Thread(target=read, args=r, name=f"sql-range-{i}") for i, r in enumerate(ranges)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        remaining = len(threads)
+        while remaining:
+            item = merged.get()
+            if item is _DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # Arrêt anticipé (erreur ou consommateur interrompu) : libérer les lecteurs
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,139 @@
+"""
+Cache des identifiants internes Neo4j des nœuds créés par l'export.
+
+Pendant la phase des nœuds, chaque création retourne l'elementId attribué
+par Neo4j ; le cache associe la clé métier (idFilm, idArtist) à cet
+identifiant. La phase des relations peut alors retrouver les extrémités
+par identifiant interne (NodeByElementIdSeek) au lieu de deux recherches
+d'index par relation.
+
+Les elementId ont la forme "4:<uuid de la base>:<entier>" : le préfixe
+commun n'est stocké qu'une fois et seul l'entier est conservé par nœud.
+Au-delà de max_entries entrées en mémoire, le cache est déversé dans un
+fichier SQLite.
+"""
+
+import sqlite3
+import tempfile
+import threading
+
+
+class NodeIdCache:
+    """Clé métier -> elementId, en mémoire puis sur disque."""
+
+    def __init__(self, max_entries=5000000, spill_path=None):
+        """
+        Args:
+            max_entries (int): Nombre d'entrées gardées en mémoire avant déversement
+            spill_path (str): Fichier SQLite de déversement (fichier temporaire par défaut)
+        """
+        self.max_entries = max_entries
+        self.spill_path = spill_path
+        self._memory = {}
+        self._prefix = None
+        self._disk = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            size = len(self._memory)
+            if self._disk:
+                size += self._disk.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+            return size
+
+    def _compact(self, element_id):
+        prefix, _, number = element_id.rpartition(":")
+        if self._prefix is None:
+            self._prefix = prefix
+        if prefix == self._prefix and number.isdigit():
+            return int(number)
+        return element_id
+
+    def _expand(self, value):
+        if isinstance(value, int):
+            return f"{self._prefix}:{value}"
+        return value
+
+    def _spill(self):
+        if self._disk is None:
+            path = self.spill_path or tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            # key sans type (pas d'affinité) : les clés entières de --compact-keys restent des entiers
+            self._disk.execute("CREATE TABLE IF NOT EXISTS ids (label TEXT, key, id, PRIMARY KEY (label, key))")
+        self._disk.executemany("INSERT OR REPLACE INTO ids VALUES (?, ?, ?)",
+                               [(label, key, value) for (label, key), value in self._memory.items()])
+        self._disk.commit()
+        self._memory.clear()
+
+    def add(self, label, pairs):
+        """
+        Enregistre des nœuds créés.
+
+        Args:
+            label (str): Label des nœuds
+            pairs (iterable): Couples (clé métier, elementId)
+        """
+        with self._lock:
+            for key, element_id in pairs:
+                self._memory[(label, key)] = self._compact(element_id)
+            if len(self._memory) > self.max_entries:
+                self._spill()
+
+    def resolve(self, label, keys):
+        """
+        Retourne les elementId connus pour une liste de clés.
+
+        Returns:
+            dict: Clé métier -> elementId (les clés inconnues sont absentes)
+        """
+        with self._lock:
+            found = {}
+            missing = []
+            for key in keys:
+                value = self._memory.get((label, key))
+                if value is None:
+                    missing.append(key)
+                else:
+                    found[key] = self._expand(value)
+            if self._disk and missing:
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i + 500]
+                    placeholders = ", ".join("?" * len(chunk))
+                    for key, value in self._disk.execute(
+                            f"SELECT key, id FROM ids WHERE label = ? AND key IN ({placeholders})", [label] + chunk):
+                        found[key] = self._expand(value)
+            return found
+
+    def close(self):
+        if self._disk:
+            self._disk.close()
+
+
+def split_resolved(cache, by_type, start_label, end_label):
+    """
+    Sépare les relations dont les deux extrémités sont dans le cache.
+
+    Args:
+        cache (NodeIdCache): Cache des elementId
+        by_type (dict): Type -> triplets (clé début, propriétés, clé fin)
+        start_label (str): Label des nœuds de départ
+        end_label (str): Label des nœuds d'arrivée
+
+    Returns:
+        tuple: (type -> triplets (elementId début, propriétés, elementId fin),
+                type -> triplets non résolus, à créer par recherche de clé)
+    """
+    triples = [triple for rel_triples in by_type.values() for triple in rel_triples]
+    starts = cache.resolve(start_label, list({t[0] for t in triples}))
+    ends = cache.resolve(end_label, list({t[2] for t in triples}))
+
+    by_id = {}
+    unresolved = {}
+    for rel_type, rel_triples in by_type.items():
+        for triple in rel_triples:
+            start, end = starts.get(triple[0]), ends.get(triple[2])
+            if start is not None and end is not None:
+                by_id.setdefault(rel_type, []).append((start, triple[1], end))
+            else:
+                unresolved.setdefault(rel_type, []).append(triple)
+    return by_id, unresolved
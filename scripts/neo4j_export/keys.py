@@ -0,0 +1,84 @@
+"""
+Clés entières pour les nœuds Film et Artist.
+
+Les identifiants IMDB ("tt0001234", "nm0001234") sont des chaînes de 9 à
+10 caractères ; leur partie numérique tient dans un entier, plus compact
+dans le stockage des propriétés et dans les index :Film(idFilm) et
+:Artist(idArtist). La chaîne d'origine se reconstruit à partir de
+l'entier et du préfixe du label ; seuls les identifiants qui n'ont pas la
+forme canonique (préfixe + au moins 7 chiffres sans zéro superflu) sont
+gardés tels quels.
+
+Les propriétés nulles ou sentinelles (0, chaîne vide, \\N) sont
+converties en null, que Neo4j ne stocke pas : un nœud sans année de
+naissance n'a simplement pas de propriété birthYear.
+"""
+
+# Préfixe des identifiants IMDB par label
+PREFIXES = {"Film": "tt", "Artist": "nm"}
+
+# Valeurs considérées comme absentes
+_SENTINELS = {0, "", "\\N"}
+
+
+def node_key(imdb_id):
+    """
+    Clé entière d'un identifiant IMDB.
+
+    Returns:
+        int | str: Partie numérique, ou l'identifiant inchangé s'il n'est pas canonique
+    """
+    if not isinstance(imdb_id, str):
+        return imdb_id
+    digits = imdb_id[2:]
+    if digits.isdigit():
+        number = int(digits)
+        if digits == f"{number:07d}":
+            return number
+    return imdb_id
+
+
+def imdb_id(label, key):
+    """Identifiant IMDB d'une clé retournée par node_key (inverse de node_key)."""
+    if isinstance(key, int):
+        return f"{PREFIXES[label]}{key:07d}"
+    return key
+
+
+def _value(value):
+    return None if value is None or value in _SENTINELS else value
+
+
+def compact_node_rows(rows):
+    """Lignes (id, propriétés...) avec clé entière et propriétés sentinelles à None."""
+    return [(node_key(row[0]),) + tuple(_value(value) for value in row[1:]) for row in rows]
+
+
+def compact_relationship_rows(rows):
+    """Lignes (idArtist, category, idFilm[, count]) avec clés entières."""
+    return [(node_key(row[0]), row[1], node_key(row[2])) + tuple(row[3:]) for row in rows]
+
+
+# Paramètres de requête contenant des identifiants, par label
+KEY_PARAMS = {"idFilm": "Film", "idArtist": "Artist"}
+
+
+def key_params(**params):
+    """
+    Traduit les paramètres idFilm / idArtist (ou listes d'identifiants) en clés entières.
+
+    Exemple :
+        graph.run("MATCH (f:Film {idFilm: $idFilm}) RETURN f", **key_params(idFilm="tt0111161"))
+    """
+    translated = {}
+    for name, value in params.items():
+        if name in KEY_PARAMS:
+            value = [node_key(v) for v in value] if isinstance(value, (list, tuple)) else node_key(value)
+        translated[name] = value
+    return translated
+
+
+def imdb_ids(record):
+    """Retraduit les colonnes idFilm / idArtist d'un résultat (dictionnaire) en identifiants IMDB."""
+    return {name: imdb_id(KEY_PARAMS[name], value) if name in KEY_PARAMS else value
+            for name, value in record.items()}
@@ -0,0 +1,114 @@
+"""
+Chargement en ligne par LOAD CSV côté serveur.
+
+Chaque lot est écrit dans un fichier CSV que le serveur Neo4j peut lire :
+soit un dossier partagé monté comme dossier d'import du serveur
+(URL file:///), soit un dossier servi en HTTP par ce programme. Le serveur
+lit et convertit lui-même les lignes, validées par
+CALL { ... } IN TRANSACTIONS : le client n'envoie plus qu'une URL par lot
+au lieu de sérialiser chaque ligne en paramètres Bolt.
+"""
+
+import csv
+import functools
+import itertools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .batching import retrying
+
+FILM_QUERY = """
+    LOAD CSV WITH HEADERS FROM $url AS row
+    CALL {{
+        WITH row
+        CREATE (:Film {{idFilm: {film_key}, primaryTitle: row.primaryTitle, startYear: toInteger(row.startYear)}})
+    }} IN TRANSACTIONS OF {rows} ROWS
+    """
+
+ARTIST_QUERY = """
+    LOAD CSV WITH HEADERS FROM $url AS row
+    CALL {{
+        WITH row
+        CREATE (:Artist {{idArtist: {artist_key}, primaryName: row.primaryName, birthYear: toInteger(row.birthYear)}})
+    }} IN TRANSACTIONS OF {rows} ROWS
+    """
+
+RELATIONSHIP_QUERY = """
+    LOAD CSV WITH HEADERS FROM $url AS row
+    CALL {{
+        WITH row
+        MATCH (a:Artist {{idArtist: {artist_key}}})
+        MATCH (f:Film {{idFilm: {film_key}}})
+        CREATE (a)-[:{rel_type}{properties}]->(f)
+    }} IN TRANSACTIONS OF {rows} ROWS
+    """
+
+
+def serve_directory(directory, port):
+    """
+    Sert un dossier en HTTP dans un thread en arrière-plan.
+
+    Returns:
+        ThreadingHTTPServer: Serveur démarré (shutdown() pour l'arrêter)
+    """
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(directory))
+    httpd = ThreadingHTTPServer(("", port), handler)
+    threading.Thread(target=httpd.serve_forever, name="load-csv-http", daemon=True).start()
+    return httpd
+
+
+class LoadCsvLoader:
+    """Écrit les lots en CSV et les fait charger par le serveur Neo4j."""
+
+    def __init__(self, run, directory, url_base="file:///", rows_per_tx=10000, integer_keys=False):
+        """
+        Args:
+            run (callable): Exécute une requête Cypher en auto-commit, ex. graph.run
+            directory (str): Dossier lisible par le serveur (ou servi en HTTP)
+            url_base (str): URL du dossier vue par le serveur
+            rows_per_tx (int): Nombre de lignes par transaction côté serveur
+            integer_keys (bool): Clés entières (keys.node_key), les clés non numériques restent des chaînes
+        """
+        self.run = run
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.url_base = url_base if url_base.endswith("/") else url_base + "/"
+        self.rows_per_tx = rows_per_tx
+        self._ids = itertools.count(1)
+        if integer_keys:
+            self._keys = {"film_key": "coalesce(toInteger(row.idFilm), row.idFilm)",
+                          "artist_key": "coalesce(toInteger(row.idArtist), row.idArtist)"}
+        else:
+            self._keys = {"film_key": "row.idFilm", "artist_key": "row.idArtist"}
+
+    def _load(self, query, header, rows):
+        name = f"chunk-{next(self._ids):06d}.csv"
+        path = self.directory / name
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        try:
+            # Au plus rows_per_tx lignes par fichier : une seule transaction, réessayée seule après un deadlock
+            retrying(lambda url: self.run(query, url=url))(self.url_base + name)
+        finally:
+            path.unlink()
+
+    def films(self, rows):
+        self._load(FILM_QUERY.format(rows=self.rows_per_tx, **self._keys), ["idFilm", "primaryTitle", "startYear"], rows)
+
+    def artists(self, rows):
+        self._load(ARTIST_QUERY.format(rows=self.rows_per_tx, **self._keys), ["idArtist", "primaryName", "birthYear"], rows)
+
+    def relationships(self, rows):
+        """Charge des lignes (idArtist, category, idFilm[, count]), un fichier par type de relation."""
+        by_type = {}
+        for row in rows:
+            by_type.setdefault(row[1].replace(" ", "_").upper(), []).append((row[0], row[2]) + tuple(row[3:]))
+        weighted = bool(rows) and len(rows[0]) > 3
+        header = ["idArtist", "idFilm", "count"] if weighted else ["idArtist", "idFilm"]
+        properties = " {count: toInteger(row.count)}" if weighted else ""
+        for rel_type, pairs in by_type.items():
+            query = RELATIONSHIP_QUERY.format(rel_type=rel_type, properties=properties, rows=self.rows_per_tx, **self._keys)
+            self._load(query, header, pairs)
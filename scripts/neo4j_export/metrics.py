@@ -0,0 +1,236 @@
+"""
+Mesures de l'export, par étape (table ou catégorie de relations).
+
+Pour chaque étape sont mesurés :
+- fetch : temps passé à attendre les lots SQL (fetchmany, pagination) ;
+- transform : préparation côté client entre la lecture et l'écriture
+  (fusion des doublons, filtrage des orphelins, clés compactes) ;
+- write : appels d'écriture, y compris la construction des paramètres et
+  la validation de la transaction Neo4j, avec les percentiles de latence
+  par lot ;
+- lignes écrites, lignes/s, lots réessayés (--adaptive-batches), lots en
+  échec et lignes abandonnées.
+
+En mode pipeline, lecture et écriture se chevauchent : la somme des temps
+peut dépasser la durée de l'étape. Le rapport est écrit en JSON et, si
+demandé, au format texte de Prometheus (collecteur textfile de
+node_exporter).
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+def timed(batches, record):
+    """Générateur qui passe les lots en appelant record(secondes) pour le temps de chaque next()."""
+    iterator = iter(batches)
+    while True:
+        start = time.perf_counter()
+        try:
+            rows = next(iterator)
+        except StopIteration:
+            return
+        record(time.perf_counter() - start)
+        yield rows
+
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche d'une liste triée."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def _round(seconds):
+    return round(seconds, 4) if seconds is not None else None
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class StageMetrics:
+    """Compteurs et temps d'une étape, alimentés par plusieurs threads."""
+
+    def __init__(self, name, total, already=0):
+        """
+        Args:
+            name (str): Nom de l'étape (table)
+            total (int): Nombre de lignes attendues
+            already (int): Lignes déjà exportées par une exécution précédente (reprise)
+        """
+        self.name = name
+        self.total = total
+        self.already = already
+        self.rows = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.dead_rows = 0
+        self.fetch_seconds = 0.0
+        self.read_seconds = 0.0
+        self.transform_seconds = 0.0
+        self.write_seconds = 0.0
+        self.latencies = []
+        self.start = time.perf_counter()
+        self.end = None
+        self._lock = threading.Lock()
+
+    def add_fetch(self, seconds):
+        with self._lock:
+            self.fetch_seconds += seconds
+
+    def add_read(self, seconds):
+        """Temps total de next() sur le flux de lots préparé (fetch compris)."""
+        with self._lock:
+            self.read_seconds += seconds
+
+    def add_transform(self, seconds):
+        with self._lock:
+            self.transform_seconds += seconds
+
+    def add_write(self, rows, seconds, retries=0, dead=0):
+        """
+        Enregistre un lot écrit.
+
+        Returns:
+            int: Nombre total de lignes exportées, reprise comprise
+        """
+        with self._lock:
+            self.rows += rows
+            self.batches += 1
+            self.retries += retries
+            self.dead_rows += dead
+            self.write_seconds += seconds
+            self.latencies.append(seconds)
+            return self.already + self.rows
+
+    def add_failure(self, seconds):
+        with self._lock:
+            self.failed_batches += 1
+            self.write_seconds += seconds
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Temps restant estimé au débit moyen de l'étape, None tant qu'aucune ligne n'est écrite."""
+        rate = self.rows_per_second
+        if not rate:
+            return None
+        return max(0, self.total - self.already - self.rows) / rate
+
+    def progress(self, what, done):
+        """Ligne de progression : compte, débit et temps restant."""
+        eta = self.eta()
+        eta_text = _format_duration(eta) if eta is not None else "?"
+        return f"{done}/{self.total} {what} exported ({self.rows_per_second:.0f} rows/s, ETA {eta_text})"
+
+    def report(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                "rows": self.rows,
+                "total": self.total,
+                "resumed_from": self.already,
+                "batches": self.batches,
+                "retries": self.retries,
+                "failed_batches": self.failed_batches,
+                "dead_rows": self.dead_rows,
+                "elapsed_seconds": round(self.elapsed, 3),
+                "rows_per_second": round(self.rows_per_second, 1),
+                "fetch_seconds": round(self.fetch_seconds, 3),
+                "transform_seconds": round(self.transform_seconds + max(0.0, self.read_seconds - self.fetch_seconds), 3),
+                "write_seconds": round(self.write_seconds, 3),
+                "batch_latency_seconds": {
+                    "p50": _round(percentile(latencies, 0.50)),
+                    "p90": _round(percentile(latencies, 0.90)),
+                    "p99": _round(percentile(latencies, 0.99)),
+                    "max": _round(latencies[-1] if latencies else None),
+                },
+            }
+
+
+class RunMetrics:
+    """Mesures de toutes les étapes d'un export."""
+
+    def __init__(self):
+        self.stages = {}
+        self.start = time.time()
+        self._lock = threading.Lock()
+
+    def stage(self, name, total, already=0):
+        with self._lock:
+            metrics = self.stages[name] = StageMetrics(name, total, already)
+            return metrics
+
+    def report(self, scheduler=None):
+        """
+        Rapport complet de l'exécution.
+
+        Args:
+            scheduler (StageScheduler): Ordonnanceur dont les durées d'étapes et le chemin critique sont ajoutés
+        """
+        report = {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.start)),
+            "elapsed_seconds": round(time.time() - self.start, 3),
+            "tables": {name: stage.report() for name, stage in self.stages.items()},
+        }
+        if scheduler is not None:
+            report["stages"] = {stage.name: {"start": round(stage.start, 3), "end": round(stage.end, 3)}
+                                for stage in scheduler.stages.values() if stage.end is not None}
+            report["critical_path"] = [stage.name for stage in scheduler.critical_path()]
+        return report
+
+    def write_json(self, path, scheduler=None):
+        Path(path).write_text(json.dumps(self.report(scheduler), indent=2))
+
+    def write_prometheus(self, path):
+        """
+        Écrit les mesures au format texte de Prometheus. Le fichier est
+        remplacé atomiquement pour que le collecteur ne lise jamais un
+        fichier à moitié écrit.
+        """
+        lines = []
+
+        def metric(name, kind, help_text, values):
+            lines.append(f"# HELP neo4j_export_{name} {help_text}")
+            lines.append(f"# TYPE neo4j_export_{name} {kind}")
+            for labels, value in values:
+                if value is not None:
+                    label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                    lines.append(f"neo4j_export_{name}{{{label_text}}} {value}")
+
+        reports = {name: stage.report() for name, stage in self.stages.items()}
+        for name, help_text in (("rows", "Rows written"), ("batches", "Batches written"),
+                                ("retries", "Batch retries after a split"), ("failed_batches", "Batches not written"),
+                                ("dead_rows", "Rows sent to the dead letter file")):
+            metric(f"{name}_total", "counter", help_text,
+                   [({"table": table}, report[name]) for table, report in reports.items()])
+        metric("rows_per_second", "gauge", "Average write throughput",
+               [({"table": table}, report["rows_per_second"]) for table, report in reports.items()])
+        metric("phase_seconds", "gauge", "Time spent per phase",
+               [({"table": table, "phase": phase}, report[f"{phase}_seconds"])
+                for table, report in reports.items() for phase in ("fetch", "transform", "write")])
+        metric("batch_latency_seconds", "gauge", "Batch write latency percentiles",
+               [({"table": table, "quantile": quantile}, report["batch_latency_seconds"][key])
+                for table, report in reports.items()
+                for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99"), ("1", "max"))])
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
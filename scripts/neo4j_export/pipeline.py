@@ -0,0 +1,129 @@
+"""
+Pipeline lecture/écriture pour l'export SQL Server -> Neo4j.
+
+Un thread lecteur extrait les lots depuis pyodbc et les dépose dans une file
+bornée, pendant qu'un ou plusieurs threads écrivains les envoient à Neo4j.
+Quand les écrivains prennent du retard, le lecteur se bloque sur la file
+pleine : au plus queue_size lots attendent en mémoire.
+"""
+
+import queue
+import threading
+
+# Marqueur de fin de flux déposé dans la file pour chaque écrivain
+_END = object()
+
+
+def fetch_batches(cursor, batch_size):
+    """
+    Génère les lots successifs d'un curseur déjà exécuté.
+
+    Args:
+        cursor (pyodbc.Cursor): Curseur sur lequel execute() a été appelé
+        batch_size (int | callable): Nombre de lignes par lot, ou fonction le retournant
+            (taille adaptative, relue avant chaque lot)
+
+    Yields:
+        list: Lot de lignes pyodbc
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size() if callable(batch_size) else batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+class ProgressCounter:
+    """Compteur de lignes exportées partagé entre plusieurs threads."""
+
+    def __init__(self, total):
+        """
+        Args:
+            total (int): Nombre total de lignes attendues
+        """
+        self.total = total
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        """
+        Ajoute n lignes au compteur.
+
+        Returns:
+            int: Nouvelle valeur du compteur
+        """
+        with self._lock:
+            self.count += n
+            return self.count
+
+
+def run_pipeline(batches, write_batch, writers=1, queue_size=2):
+    """
+    Consomme les lots dans un thread lecteur et les écrit en parallèle.
+
+    Le thread lecteur itère sur batches (typiquement fetch_batches) : l'appel
+    réseau vers SQL Server se recouvre ainsi avec les écritures Neo4j. Avec
+    queue_size=2, un lot est en cours d'écriture pendant que le suivant est
+    déjà prêt (double buffering).
+
+    Args:
+        batches (iterable): Lots à écrire, consommés dans le thread lecteur
+        write_batch (callable): Fonction appelée avec chaque lot par un écrivain
+        writers (int): Nombre de threads écrivains
+        queue_size (int): Nombre maximal de lots en attente dans la file
+
+    Raises:
+        Exception: La première erreur levée par le lecteur ou un écrivain
+    """
+    pending = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        # put() bloquant mais interruptible si un écrivain a échoué
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+        finally:
+            for _ in range(writers):
+                put(_END)
+
+    def write():
+        while True:
+            try:
+                batch = pending.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if batch is _END:
+                return
+            try:
+                write_batch(batch)
+            except Exception as error:
+                errors.append(error)
+                stop.set()
+                return
+
+    threads = [threading.Thread(target=read, name="sql-reader")]
+    threads += [threading.Thread(target=write, name=f"neo4j-writer-{i}") for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
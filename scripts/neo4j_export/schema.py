@@ -0,0 +1,91 @@
+"""
+Création du schéma Neo4j avant le chargement.
+
+Les contraintes d'unicité sur :Film(idFilm) et :Artist(idArtist) sont
+créées avant les nœuds, avec la syntaxe actuelle (CREATE CONSTRAINT ...
+IF NOT EXISTS FOR ... REQUIRE ... IS UNIQUE) : relancer l'export ne les
+recrée pas. Chaque contrainte s'appuie sur un index, maintenu au fil des
+créations de nœuds.
+
+Un index créé sur un graphe déjà rempli (export repris, base non vidée)
+est d'abord en état POPULATING : tant qu'il n'est pas ONLINE, les MATCH des
+relations se rabattent sur un parcours de tous les nœuds du label.
+wait_for_indexes bloque donc jusqu'à ce que tous les index soient ONLINE.
+"""
+
+import time
+
+# (label, propriété clé) des nœuds exportés
+NODE_KEYS = [("Film", "idFilm"), ("Artist", "idArtist")]
+
+
+def constraint_name(label, key):
+    return f"{label.lower()}_{key.lower()}_unique"
+
+
+def constraint_query(label, key):
+    """Requête idempotente de création de la contrainte d'unicité d'un label."""
+    return (f"CREATE CONSTRAINT {constraint_name(label, key)} IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.{key} IS UNIQUE")
+
+
+def _drop_plain_indexes(run, data, label, key):
+    """Supprime un ancien index simple sur la même propriété, qui empêcherait la création de la contrainte."""
+    indexes = data("SHOW INDEXES YIELD name, labelsOrTypes, properties, owningConstraint "
+                   "WHERE labelsOrTypes = [$label] AND properties = [$key] AND owningConstraint IS NULL "
+                   "RETURN name", label=label, key=key)
+    for index in indexes:
+        print(f"Dropping index {index['name']} (replaced by a uniqueness constraint)")
+        run(f"DROP INDEX {index['name']} IF EXISTS")
+
+
+def wait_for_indexes(data, timeout=600, poll=1.0):
+    """
+    Attend que tous les index soient ONLINE.
+
+    Args:
+        data (callable): Exécute une requête et retourne des dictionnaires, ex. backend.data
+        timeout (float): Délai maximal en secondes
+        poll (float): Intervalle entre deux vérifications
+
+    Returns:
+        float: Durée d'attente en secondes
+
+    Raises:
+        RuntimeError: Un index est en échec ou le délai est dépassé
+    """
+    start = time.perf_counter()
+    while True:
+        pending = data("SHOW INDEXES YIELD name, state, populationPercent "
+                       "WHERE state <> 'ONLINE' RETURN name, state, populationPercent")
+        failed = [index["name"] for index in pending if index["state"] == "FAILED"]
+        if failed:
+            raise RuntimeError(f"Index population failed: {', '.join(failed)}")
+        elapsed = time.perf_counter() - start
+        if not pending:
+            return elapsed
+        if elapsed > timeout:
+            raise RuntimeError(f"Indexes still not online after {timeout} s: "
+                               + ", ".join(index["name"] for index in pending))
+        print("Waiting for indexes: " + ", ".join(
+            f"{index['name']} {index['state']} {index['populationPercent'] or 0:.0f}%" for index in pending))
+        time.sleep(poll)
+
+
+def provision_schema(run, data, node_keys=NODE_KEYS, timeout=600):
+    """
+    Crée les contraintes d'unicité et attend que leurs index soient en ligne.
+
+    Args:
+        run (callable): Exécute une requête en auto-commit, ex. backend.run
+        data (callable): Exécute une requête et retourne des dictionnaires, ex. backend.data
+        node_keys (list): Couples (label, propriété clé)
+        timeout (float): Délai maximal d'attente des index en secondes
+
+    Returns:
+        float: Durée de population des index en secondes
+    """
+    for label, key in node_keys:
+        _drop_plain_indexes(run, data, label, key)
+        run(constraint_query(label, key))
+    return wait_for_indexes(data, timeout)
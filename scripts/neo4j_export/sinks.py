@@ -0,0 +1,213 @@
+"""
+Destinations d'écriture sans serveur Neo4j.
+
+Elles implémentent la même interface que les backends (voir backends.py :
+run, evaluate, data, run_system, create_nodes, create_nodes_returning_ids,
+create_relationships, close) et se substituent à Neo4j derrière
+export-neo4j.py :
+- NullSink jette les données en comptant lignes et octets : le débit
+  mesuré est celui de la lecture SQL et de la préparation seules ;
+- RecordingSink garde en mémoire tout ce qui est écrit, pour les tests ;
+- NdjsonSink écrit un objet JSON par nœud ou relation dans un fichier ;
+- CsvSink et ParquetSink écrivent un fichier par label et par type de
+  relation dans un dossier (instantanés du graphe).
+
+Les octets comptés sont ceux de la sérialisation JSON des paramètres, une
+estimation du volume qui serait envoyé au serveur.
+"""
+
+import csv
+import itertools
+import json
+import threading
+from pathlib import Path
+
+
+def _size(value):
+    return len(json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":")))
+
+
+class NullSink:
+    """Compte les lignes et octets reçus, sans rien écrire."""
+
+    def __init__(self, path=None):
+        self.nodes = 0
+        self.relationships = 0
+        self.bytes = 0
+        self.queries = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def run(self, query, **params):
+        with self._lock:
+            self.queries += 1
+
+    def evaluate(self, query, **params):
+        self.run(query, **params)
+        return 0
+
+    def data(self, query, **params):
+        self.run(query, **params)
+        return []
+
+    def run_system(self, query):
+        self.run(query)
+
+    def _emit_nodes(self, label, keys, rows):
+        """Appelée sous verrou ; rien à faire pour NullSink."""
+
+    def _emit_relationships(self, rel_type, triples):
+        """Appelée sous verrou ; rien à faire pour NullSink."""
+
+    def create_nodes(self, label, keys, rows):
+        size = _size(rows)
+        with self._lock:
+            self.nodes += len(rows)
+            self.bytes += size
+            self._emit_nodes(label, keys, rows)
+
+    def create_nodes_returning_ids(self, label, keys, rows):
+        """Comme create_nodes, avec des elementId fictifs pour le cache d'identifiants."""
+        self.create_nodes(label, keys, rows)
+        with self._lock:
+            return [(row[0], f"4:sink:{next(self._ids)}") for row in rows]
+
+    def create_relationships(self, by_type, start_node_key, end_node_key, by_id=None):
+        for groups in (by_type, by_id or {}):
+            for rel_type, triples in groups.items():
+                size = _size(triples)
+                with self._lock:
+                    self.relationships += len(triples)
+                    self.bytes += size
+                    self._emit_relationships(rel_type, triples)
+
+    def summary(self):
+        return (f"{type(self).__name__}: {self.nodes} nodes, {self.relationships} relationships, "
+                f"{self.bytes / 1e6:.1f} MB of parameters, {self.queries} other queries")
+
+    def close(self):
+        pass
+
+
+class RecordingSink(NullSink):
+    """Garde en mémoire les requêtes, nœuds et relations reçus."""
+
+    def __init__(self, path=None):
+        super().__init__(path)
+        self.recorded_queries = []
+        self.recorded_nodes = {}
+        self.recorded_relationships = {}
+
+    def run(self, query, **params):
+        super().run(query, **params)
+        with self._lock:
+            self.recorded_queries.append((query, params))
+
+    def _emit_nodes(self, label, keys, rows):
+        self.recorded_nodes.setdefault(label, []).extend(dict(zip(keys, row)) for row in rows)
+
+    def _emit_relationships(self, rel_type, triples):
+        self.recorded_relationships.setdefault(rel_type, []).extend(
+            (start, end, properties) for start, properties, end in triples)
+
+
+class NdjsonSink(NullSink):
+    """Écrit nœuds et relations dans un fichier JSON lines."""
+
+    def __init__(self, path):
+        if not path:
+            raise ValueError("NdjsonSink needs an output file")
+        super().__init__(path)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write(self, records):
+        self._file.writelines(json.dumps(record, default=str, ensure_ascii=False) + "\n" for record in records)
+
+    def _emit_nodes(self, label, keys, rows):
+        self._write({"type": "node", "label": label, "properties": dict(zip(keys, row))} for row in rows)
+
+    def _emit_relationships(self, rel_type, triples):
+        self._write({"type": "relationship", "rel_type": rel_type, "start": start, "end": end, "properties": properties}
+                    for start, properties, end in triples)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class CsvSink(NullSink):
+    """Un fichier CSV par label (Film.csv) et par type de relation (ACTED_IN.csv)."""
+
+    def __init__(self, directory):
+        if not directory:
+            raise ValueError("CsvSink needs an output directory")
+        super().__init__(directory)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._files = {}
+
+    def _writer(self, name, header):
+        if name not in self._files:
+            f = open(self.directory / f"{name}.csv", "w", newline="", encoding="utf-8")
+            writer = csv.writer(f)
+            writer.writerow(header)
+            self._files[name] = (f, writer)
+        return self._files[name][1]
+
+    def _emit_nodes(self, label, keys, rows):
+        self._writer(label, keys).writerows(rows)
+
+    def _emit_relationships(self, rel_type, triples):
+        # Colonnes de propriétés prises sur la première relation du type (count...)
+        keys = sorted(triples[0][1]) if triples else []
+        writer = self._writer(rel_type, ["start", "end"] + keys)
+        writer.writerows([start, end] + [properties.get(key) for key in keys] for start, properties, end in triples)
+
+    def close(self):
+        with self._lock:
+            for f, _ in self._files.values():
+                f.close()
+            self._files = {}
+
+
+class ParquetSink(NullSink):
+    """Un fichier Parquet par label et par type de relation (pyarrow requis)."""
+
+    def __init__(self, directory):
+        if not directory:
+            raise ValueError("ParquetSink needs an output directory")
+        # Import local : pyarrow n'est requis que pour cette destination
+        import pyarrow
+        import pyarrow.parquet
+
+        super().__init__(directory)
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._writers = {}
+
+    def _write(self, name, records):
+        # Schéma déduit du premier lot, imposé aux suivants
+        writer = self._writers.get(name)
+        table = self.pa.Table.from_pylist(records, schema=writer.schema if writer else None)
+        if writer is None:
+            writer = self._writers[name] = self.pq.ParquetWriter(str(self.directory / f"{name}.parquet"), table.schema)
+        writer.write_table(table)
+
+    def _emit_nodes(self, label, keys, rows):
+        self._write(label, [dict(zip(keys, row)) for row in rows])
+
+    def _emit_relationships(self, rel_type, triples):
+        self._write(rel_type, [dict(properties, start=start, end=end) for start, properties, end in triples])
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers = {}
+
+
+SINKS = {"null": NullSink, "ndjson": NdjsonSink, "record": RecordingSink, "csv": CsvSink, "parquet": ParquetSink}
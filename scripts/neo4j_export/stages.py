@@ -0,0 +1,139 @@
+"""
+Ordonnancement des étapes de l'export selon leurs dépendances.
+
+L'export est décrit comme un petit graphe orienté sans cycle d'étapes
+(schéma, Films, Artists, index, relations par catégorie). Une étape
+démarre dès que toutes celles dont elle dépend sont terminées, dans la
+limite de max_parallel étapes simultanées : Films et Artists se chargent
+en même temps, et la durée totale tend vers celle de la plus longue chaîne
+de dépendances (le chemin critique) plutôt que vers la somme des étapes.
+
+Deux étapes parallèles qui écrivent sur les mêmes nœuds (les relations de
+deux catégories partagent leurs Artist et Film) partagent une fonction
+d'écriture enveloppée par serialized : leurs lectures SQL restent
+parallèles, leurs transactions Neo4j se succèdent.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def serialized(write_batch):
+    """Enveloppe une fonction d'écriture partagée par plusieurs étapes : un seul lot écrit à la fois."""
+    lock = threading.Lock()
+
+    def write(rows):
+        with lock:
+            return write_batch(rows)
+    return write
+
+
+class Stage:
+    """Une étape : fonction sans argument et noms des étapes préalables."""
+
+    def __init__(self, name, run, after=()):
+        self.name = name
+        self.run = run
+        self.after = list(after)
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+class StageScheduler:
+    """Exécute des étapes dépendantes, les étapes indépendantes en parallèle."""
+
+    def __init__(self, max_parallel=1):
+        """
+        Args:
+            max_parallel (int): Nombre maximal d'étapes exécutées en même temps
+        """
+        self.max_parallel = max(1, max_parallel)
+        self.stages = {}
+        self._origin = None
+
+    def add(self, name, run, after=()):
+        """
+        Ajoute une étape. Ses dépendances doivent déjà avoir été ajoutées,
+        ce qui exclut tout cycle.
+        """
+        unknown = [dependency for dependency in after if dependency not in self.stages]
+        if unknown:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(unknown)}")
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage {name}")
+        self.stages[name] = Stage(name, run, after)
+
+    def _timed(self, stage):
+        stage.start = time.perf_counter() - self._origin
+        try:
+            stage.run()
+        finally:
+            stage.end = time.perf_counter() - self._origin
+
+    def run(self):
+        """
+        Exécute toutes les étapes. À la première erreur, plus aucune étape
+        n'est lancée ; celles en cours se terminent, puis l'erreur est relevée.
+        """
+        self._origin = time.perf_counter()
+        waiting = list(self.stages.values())
+        done = set()
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="stage") as executor:
+            while waiting or running:
+                if error is None:
+                    # Ordre d'ajout parmi les étapes prêtes
+                    for stage in [s for s in waiting if all(d in done for d in s.after)]:
+                        if len(running) >= self.max_parallel:
+                            break
+                        waiting.remove(stage)
+                        running[executor.submit(self._timed, stage)] = stage
+                elif not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    else:
+                        done.add(stage.name)
+        if error is not None:
+            raise error
+
+    def critical_path(self):
+        """
+        Chaîne d'étapes qui a déterminé la durée totale : en partant de la
+        dernière étape terminée, on remonte à chaque fois vers la dépendance
+        terminée le plus tard.
+
+        Returns:
+            list: Étapes, de la première à la dernière
+        """
+        finished = [stage for stage in self.stages.values() if stage.end is not None]
+        if not finished:
+            return []
+        stage = max(finished, key=lambda s: s.end)
+        path = [stage]
+        while stage.after:
+            stage = max((self.stages[name] for name in stage.after), key=lambda s: s.end)
+            path.append(stage)
+        return path[::-1]
+
+    def summary(self):
+        """Durée de chaque étape et chemin critique, en texte."""
+        lines = []
+        for stage in self.stages.values():
+            if stage.end is not None:
+                lines.append(f"  {stage.name:<28} {stage.start:8.1f} s -> {stage.end:8.1f} s ({stage.duration:.1f} s)")
+        path = self.critical_path()
+        if path:
+            total = path[-1].end
+            lines.append(f"Critical path ({total:.1f} s): "
+                         + " -> ".join(f"{stage.name} ({stage.duration:.1f} s)" for stage in path))
+        return "\n".join(lines)
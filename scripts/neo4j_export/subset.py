@@ -0,0 +1,125 @@
+"""
+Export d'un sous-ensemble cohérent du graphe IMDB.
+
+Un prédicat choisit les films (années de sortie, échantillon, condition SQL
+libre) et éventuellement les catégories de crédits ; la fermeture
+référentielle est calculée par SQL Server lui-même, dans les requêtes de
+lecture :
+- TFilm : les films qui satisfont le prédicat ;
+- tJob : les crédits de ces films (et des catégories demandées) ;
+- tArtist : exactement les artistes cités par ces crédits.
+
+L'échantillon aléatoire est un hachage de idFilm (CHECKSUM) et non
+TABLESAMPLE ou NEWID() : il est déterministe pour une graine donnée, donc
+identique dans les trois requêtes et d'une exécution à l'autre.
+
+Les prédicats sont des conditions SQL entre parenthèses, à passer à
+export_table(where=...) ; elles se combinent avec les bornes de clés
+ajoutées par la lecture parallèle ou la pagination.
+"""
+
+# Résolution de l'échantillon : 1/1000000
+SAMPLE_BUCKETS = 1000000
+
+
+def quote(value):
+    """Littéral SQL chaîne (apostrophes doublées)."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def and_where(*conditions):
+    """Conjonction des conditions non vides, None si aucune."""
+    conditions = [condition for condition in conditions if condition]
+    if not conditions:
+        return None
+    return " AND ".join(f"({condition})" for condition in conditions)
+
+
+def parse_years(text):
+    """
+    Intervalle d'années 1990:2000 (bornes incluses, l'une ou l'autre peut manquer).
+
+    Returns:
+        tuple: (première année | None, dernière année | None)
+
+    Raises:
+        ValueError: Intervalle mal formé
+    """
+    first, separator, last = text.partition(":")
+    if not separator:
+        # Une seule année
+        last = first
+    first = int(first) if first.strip() else None
+    last = int(last) if last.strip() else None
+    if first is not None and last is not None and first > last:
+        raise ValueError(f"empty year range {text!r}")
+    return first, last
+
+
+class Subset:
+    """Prédicats SQL des films, crédits et artistes d'un sous-ensemble."""
+
+    def __init__(self, years=None, categories=None, sample=None, seed=0, films=None):
+        """
+        Args:
+            years (tuple): (première, dernière) année de sortie, bornes None = non bornées
+            categories (list): Catégories de crédits conservées (toutes si None)
+            sample (float): Pourcentage de films tirés (0 < sample <= 100)
+            seed (int): Graine de l'échantillon
+            films (str): Condition SQL libre sur les colonnes de TFilm
+        """
+        if sample is not None and not 0 < sample <= 100:
+            raise ValueError(f"sample must be a percentage in ]0, 100], got {sample}")
+        self.years = years
+        self.categories = list(categories) if categories else None
+        self.sample = sample
+        self.seed = seed
+        self.condition = films
+
+    @property
+    def active(self):
+        return bool(self.years or self.categories or self.sample is not None or self.condition)
+
+    @property
+    def films(self):
+        """Prédicat sur TFilm, None si tous les films sont exportés."""
+        conditions = [self.condition]
+        if self.years:
+            first, last = self.years
+            if first is not None:
+                conditions.append(f"startYear >= {int(first)}")
+            if last is not None:
+                conditions.append(f"startYear <= {int(last)}")
+        if self.sample is not None and self.sample < 100:
+            threshold = round(self.sample / 100 * SAMPLE_BUCKETS)
+            conditions.append(f"ABS(CHECKSUM(idFilm, {int(self.seed)})) % {SAMPLE_BUCKETS} < {threshold}")
+        return and_where(*conditions)
+
+    @property
+    def jobs(self):
+        """Prédicat sur tJob : crédits des films retenus, dans les catégories retenues."""
+        films = self.films
+        conditions = [f"idFilm IN (SELECT idFilm FROM TFilm WHERE {films})" if films else None]
+        if self.categories:
+            conditions.append(f"category IN ({', '.join(quote(category) for category in self.categories)})")
+        return and_where(*conditions)
+
+    @property
+    def artists(self):
+        """Prédicat sur tArtist : artistes cités par les crédits retenus."""
+        jobs = self.jobs
+        return f"idArtist IN (SELECT idArtist FROM tJob WHERE {jobs})" if jobs else None
+
+    def describe(self):
+        parts = []
+        if self.years:
+            first, last = self.years
+            parts.append(f"released {first if first is not None else '...'}-{last if last is not None else '...'}")
+        if self.sample is not None:
+            parts.append(f"{self.sample:g} % sample (seed {self.seed})")
+        if self.condition:
+            parts.append(f"where {self.condition}")
+        text = "films " + ", ".join(parts) if parts else "all films"
+        if self.categories:
+            text += f"; credits {', '.join(self.categories)}"
+        return text
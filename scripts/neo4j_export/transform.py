@@ -0,0 +1,88 @@
+"""
+Transformation directe des lignes pyodbc en paramètres pour py2neo.bulk.
+
+create_nodes accepte des listes de valeurs accompagnées de la liste des
+clés : inutile de construire un objet py2neo.data.Node par ligne, qui serait
+de toute façon redécomposé en dictionnaire avant l'envoi. Les noms de
+propriétés ne sont alors transmis qu'une fois par lot.
+"""
+
+from .columnar import ColumnBatch, DictionaryColumn
+
+FILM_KEYS = ["idFilm", "primaryTitle", "startYear"]
+ARTIST_KEYS = ["idArtist", "primaryName", "birthYear"]
+
+# Propriétés vides partagées par toutes les relations (aucune n'est modifiée)
+_NO_PROPERTIES = {}
+
+
+def node_params(rows):
+    """
+    Convertit des lignes pyodbc en listes de valeurs.
+
+    Args:
+        rows (list): Lignes dont les colonnes suivent FILM_KEYS ou ARTIST_KEYS
+
+    Returns:
+        list: Listes de valeurs, à passer à create_nodes avec keys=...
+    """
+    if isinstance(rows, ColumnBatch):
+        return rows.to_lists()
+    return [list(row) for row in rows]
+
+
+def relationship_params(rows):
+    """
+    Regroupe des lignes (idArtist, category, idFilm) par type de relation.
+
+    Les lignes issues de dedupe.collapse_duplicates portent un quatrième
+    champ, le nombre d'occurrences, exporté en propriété count.
+
+    Returns:
+        dict: Type de relation -> triplets (idArtist, propriétés, idFilm) pour create_relationships
+    """
+    if isinstance(rows, ColumnBatch) and isinstance(rows.columns[1], DictionaryColumn):
+        return _columnar_relationship_params(rows)
+    by_category = {}
+    for row in rows:
+        category = row[1]
+        triples = by_category.get(category)
+        if triples is None:
+            triples = by_category[category] = []
+        properties = {"count": row[3]} if len(row) > 3 else _NO_PROPERTIES
+        triples.append((row[0], properties, row[2]))
+    return {category.replace(" ", "_").upper(): triples for category, triples in by_category.items()}
+
+
+def _endpoint_values(column):
+    """Tableau NumPy indexable des clés d'une colonne d'extrémités."""
+    import numpy as np
+
+    # Une colonne de clés peut être codée par dictionnaire si le premier lot en répète beaucoup
+    if isinstance(column, DictionaryColumn):
+        return column.decoded()
+    if column.mask is not None:
+        return np.array(column.to_list(), dtype=object)
+    return column.values
+
+
+def _columnar_relationship_params(batch):
+    """relationship_params sur un lot en colonnes : regroupement par code de catégorie avec NumPy."""
+    import numpy as np
+
+    starts, categories, ends = batch.columns[:3]
+    start_values, end_values = _endpoint_values(starts), _endpoint_values(ends)
+    # Tri stable par code : chaque catégorie devient une tranche contiguë
+    order = np.argsort(categories.codes, kind="stable")
+    codes = categories.codes[order]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    by_type = {}
+    for lo, hi in zip(np.concatenate(([0], bounds)).tolist(), np.concatenate((bounds, [len(codes)])).tolist()):
+        code = int(codes[lo])
+        if code < 0:
+            continue
+        selected = order[lo:hi]
+        rel_type = categories.dictionary[code].replace(" ", "_").upper()
+        by_type[rel_type] = list(zip(start_values[selected].tolist(), [_NO_PROPERTIES] * (hi - lo),
+                                     end_values[selected].tolist()))
+    return by_type
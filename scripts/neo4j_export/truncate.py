@@ -0,0 +1,64 @@
+"""
+Vidage du graphe par lots avant un rechargement complet.
+
+Supprimer toutes les relations ou tous les nœuds d'un label en une seule
+transaction garde l'ensemble des suppressions en mémoire et verrouille tout
+le graphe. Ici chaque requête ne supprime qu'un lot borné (LIMIT) et est
+validée aussitôt ; on recommence jusqu'à ce qu'il ne reste rien.
+"""
+
+import time
+
+
+def delete_in_batches(evaluate, match, what, batch_size):
+    """
+    Supprime des éléments par lots de taille bornée.
+
+    Args:
+        evaluate (callable): Exécute une requête Cypher et retourne la première valeur
+        match (str): Motif Cypher liant la variable x à supprimer
+        what (str): Libellé affiché dans la progression
+        batch_size (int): Nombre maximal d'éléments supprimés par transaction
+
+    Returns:
+        int: Nombre d'éléments supprimés
+    """
+    total = evaluate(f"MATCH {match} RETURN count(x)")
+    deleted = 0
+    start = time.perf_counter()
+    while True:
+        count = evaluate(f"MATCH {match} WITH x LIMIT $n DETACH DELETE x RETURN count(x)", n=batch_size)
+        if not count:
+            break
+        deleted += count
+        rate = deleted / max(time.perf_counter() - start, 1e-9)
+        print(f"{deleted}/{total} {what} deleted ({rate:.0f}/s)")
+    return deleted
+
+
+def truncate_graph(evaluate, labels, batch_size=10000):
+    """
+    Supprime les relations puis les nœuds des labels donnés, par lots.
+
+    Args:
+        evaluate (callable): Exécute une requête Cypher et retourne la première valeur
+        labels (list): Labels des nœuds à supprimer
+        batch_size (int): Nombre maximal d'éléments supprimés par transaction
+    """
+    delete_in_batches(evaluate, "()-[x]->()", "relationships", batch_size)
+    for label in labels:
+        delete_in_batches(evaluate, f"(x:{label})", f"{label} nodes", batch_size)
+
+
+def recreate_database(run_system, database):
+    """
+    Supprime et recrée la base entière (Neo4j Enterprise, base system).
+
+    Plus rapide que la suppression par lots sur un gros graphe, mais efface
+    aussi les index et contraintes.
+
+    Args:
+        run_system (callable): Exécute une requête sur la base system
+        database (str): Nom de la base à recréer
+    """
+    run_system(f"CREATE OR REPLACE DATABASE `{database}` WAIT")
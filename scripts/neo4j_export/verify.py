@@ -0,0 +1,303 @@
+"""
+Vérification du graphe par agrégats, sans comparaison ligne à ligne.
+
+Les deux côtés calculent les mêmes agrégats, indépendants de l'ordre, par
+tranche de clés (partie numérique de idFilm / idArtist divisée par une
+largeur commune) :
+- nœuds, par label : nombre de nœuds, somme d'un hachage de la clé, somme
+  d'un hachage liant la clé à l'année et à la présence du titre / nom ;
+- relations, par type et par tranche de idFilm : nombre de relations
+  (propriété count comprise, voir --collapse-duplicates) et somme d'un
+  hachage du couple (artiste, film).
+
+Quelques requêtes d'agrégation suffisent donc pour tout le graphe ; seules
+les tranches dont les agrégats diffèrent sont ensuite détaillées (clés de
+la tranche lues dans SQL Server, recherchées par index dans Neo4j).
+
+Le hachage est une multiplication modulo 2^32 (méthode de Knuth),
+calculable à l'identique en T-SQL (BIGINT) et en Cypher (entiers 64 bits).
+La partie numérique de la clé est la même que l'identifiant soit stocké
+en chaîne ("tt0001234") ou en entier (--compact-keys).
+
+Côté SQL, seuls les crédits dont l'artiste et le film existent sont
+attendus dans le graphe ; les autres sont comptés à part.
+"""
+
+import csv
+from collections import Counter
+
+from .keys import PREFIXES, imdb_id, node_key
+from .subset import and_where, quote
+
+MIX = 2654435761
+MOD = 4294967296
+# Les hachages de propriétés gardent 16 bits de la clé : les produits restent loin du dépassement
+LOW_BITS = 65536
+# Valeurs stockées comme absentes par --compact-keys
+SENTINELS = ["", "\\N"]
+
+# Label, table, clé, année, libellé
+NODE_CHECKS = [
+    ("Film", "TFilm", "idFilm", "startYear", "primaryTitle"),
+    ("Artist", "tArtist", "idArtist", "birthYear", "primaryName"),
+]
+
+ENDPOINTS = ("EXISTS (SELECT 1 FROM TFilm f WHERE f.idFilm = tJob.idFilm) AND "
+             "EXISTS (SELECT 1 FROM tArtist a WHERE a.idArtist = tJob.idArtist)")
+
+
+def sql_number(column, prefix):
+    """Partie numérique d'un identifiant en T-SQL (NULL si elle n'est pas numérique)."""
+    return (f"(CASE WHEN {column} LIKE '{prefix}%' THEN TRY_CAST(SUBSTRING({column}, {len(prefix) + 1}, 20) AS BIGINT) "
+            f"ELSE TRY_CAST({column} AS BIGINT) END)")
+
+
+def cypher_number(expression, prefix):
+    """Partie numérique d'une clé en Cypher, chaîne ou entier (STARTS WITH vaut null sur un entier)."""
+    return (f"(CASE WHEN {expression} STARTS WITH '{prefix}' THEN toInteger(substring({expression}, {len(prefix)})) "
+            f"ELSE toInteger({expression}) END)")
+
+
+def sql_hash(number):
+    return f"(({number} * CAST({MIX} AS BIGINT)) % {MOD})"
+
+
+def cypher_hash(number):
+    return f"(({number} * {MIX}) % {MOD})"
+
+
+def _bucket_condition(expression, bucket):
+    """Condition SQL et paramètres sélectionnant une tranche (None = clés non numériques)."""
+    if bucket is None:
+        return f"{expression} IS NULL", []
+    return f"{expression} = ?", [bucket]
+
+
+def _aggregates(values):
+    # SUM vaut NULL côté SQL sur une tranche sans valeur, 0 côté Cypher
+    return tuple(int(value or 0) for value in values)
+
+
+def _name_present(name):
+    return name is not None and name not in SENTINELS
+
+
+def _year(year):
+    return None if year in (None, 0) else int(year)
+
+
+class GraphVerifier:
+    """Compare SQL Server et Neo4j par agrégats, puis détaille les tranches différentes."""
+
+    def __init__(self, cursor, data, buckets=1024, integer_keys=False, films=None, artists=None, jobs=None):
+        """
+        Args:
+            cursor (pyodbc.Cursor): Curseur SQL Server
+            data (callable): data(requête, **paramètres) d'un backend Neo4j
+            buckets (int): Nombre de tranches de clés par label
+            integer_keys (bool): Clés stockées en entiers dans Neo4j (--compact-keys)
+            films (str): Condition SQL sur TFilm (sous-ensemble exporté)
+            artists (str): Condition SQL sur tArtist
+            jobs (str): Condition SQL sur tJob
+        """
+        self.cursor = cursor
+        self.data = data
+        self.buckets = buckets
+        self.integer_keys = integer_keys
+        self.where = {"TFilm": films, "tArtist": artists, "tJob": jobs}
+        self.widths = {}
+        self.differences = []
+        self.mismatched = []
+        self.checked = 0
+
+    def width(self, label, table, key):
+        """Largeur des tranches d'un label, calculée sur la plus grande clé SQL."""
+        if label not in self.widths:
+            self.cursor.execute(f"SELECT MAX({sql_number(key, PREFIXES[label])}) FROM {table}")
+            largest = self.cursor.fetchone()[0] or 0
+            self.widths[label] = max(1, -(-(int(largest) + 1) // self.buckets))
+        return self.widths[label]
+
+    def _sql(self, query, params=()):
+        if params:
+            self.cursor.execute(query, *params)
+        else:
+            self.cursor.execute(query)
+        return self.cursor.fetchall()
+
+    def _graph_key(self, label, key):
+        return node_key(key) if self.integer_keys else key
+
+    def _difference(self, kind, what, key, detail=""):
+        self.differences.append({"kind": kind, "what": what, "key": key, "detail": detail})
+
+    # Nœuds
+
+    def node_aggregates(self, label, table, key, year, name):
+        """Agrégats par tranche des deux côtés : {tranche: (nombre, hachage clé, hachage année, hachage libellé)}."""
+        prefix = PREFIXES[label]
+        width = self.width(label, table, key)
+        number = sql_number(key, prefix)
+        condition = f" WHERE {self.where[table]}" if self.where[table] else ""
+        rows = self._sql(f"""
+            SELECT bucket, COUNT(*), SUM(h), SUM((h % {LOW_BITS}) * (ISNULL(y, 0) + 1)),
+                   SUM(CASE WHEN label_text IS NULL OR label_text IN ('', '\\N') THEN 0 ELSE h % {LOW_BITS} END)
+            FROM (SELECT {number} / {width} AS bucket, {sql_hash(number)} AS h, {year} AS y, {name} AS label_text
+                  FROM {table}{condition}) t
+            GROUP BY bucket""")
+        expected = {row[0]: _aggregates(row[1:]) for row in rows}
+
+        number = cypher_number(f"n.{key}", prefix)
+        records = self.data(f"""
+            MATCH (n:{label})
+            WITH {number} AS k, n.{year} AS year, n.{name} AS name
+            WITH k / $width AS bucket, {cypher_hash("k")} AS h, year, name
+            RETURN bucket, count(*) AS rows, sum(h) AS key_hash,
+                   sum((h % {LOW_BITS}) * (coalesce(year, 0) + 1)) AS year_hash,
+                   sum(CASE WHEN name IS NULL OR name IN $sentinels THEN 0 ELSE h % {LOW_BITS} END) AS name_hash""",
+                            width=width, sentinels=SENTINELS)
+        actual = {record["bucket"]: _aggregates((record["rows"], record["key_hash"], record["year_hash"], record["name_hash"]))
+                  for record in records}
+        return expected, actual
+
+    def drill_nodes(self, label, table, key, year, name, bucket, graph_rows):
+        """Clés, années et présence du libellé d'une tranche, comparées nœud par nœud."""
+        prefix = PREFIXES[label]
+        width = self.widths[label]
+        condition, params = _bucket_condition(f"{sql_number(key, prefix)} / {width}", bucket)
+        rows = self._sql(f"SELECT {key}, {year}, {name} FROM {table} WHERE {and_where(condition, self.where[table])}", params)
+        expected = Counter((row[0], _year(row[1]), _name_present(row[2])) for row in rows)
+
+        returned = f"RETURN n.{key} AS key, n.{year} AS year, n.{name} AS name"
+        records = self.data(f"UNWIND $keys AS key MATCH (n:{label} {{{key}: key}}) {returned}",
+                            keys=[self._graph_key(label, row[0]) for row in rows])
+        if len(records) < graph_rows:
+            # Nœuds dont la clé n'est pas dans SQL Server : parcours du label limité à la tranche
+            records = self.data(f"MATCH (n:{label}) WITH n, {cypher_number(f'n.{key}', prefix)} / $width AS bucket "
+                                f"WHERE bucket {'IS NULL' if bucket is None else '= $bucket'} {returned}",
+                                width=width, bucket=bucket)
+        actual = Counter((imdb_id(label, record["key"]), _year(record["year"]), _name_present(record["name"]))
+                         for record in records)
+
+        missing, unexpected = expected - actual, actual - expected
+        missing_keys = {node[0] for node in missing}
+        unexpected_keys = {node[0]: node for node in unexpected}
+        for node, count in missing.items():
+            if node[0] in unexpected_keys:
+                found = unexpected_keys[node[0]]
+                self._difference("different", label, node[0], f"expected year={node[1]}, {name} present={node[2]}; "
+                                                              f"found year={found[1]}, {name} present={found[2]}")
+            else:
+                self._difference("missing", label, node[0], f"{count} node(s)")
+        for node, count in unexpected.items():
+            if node[0] not in missing_keys:
+                self._difference("unexpected", label, node[0], f"{count} node(s)")
+
+    def check_nodes(self, label, table, key, year, name):
+        expected, actual = self.node_aggregates(label, table, key, year, name)
+        for bucket in sorted(set(expected) | set(actual), key=lambda b: (b is None, b or 0)):
+            self.checked += 1
+            if expected.get(bucket) != actual.get(bucket):
+                self.mismatched.append((label, bucket, expected.get(bucket), actual.get(bucket)))
+                self.drill_nodes(label, table, key, year, name, bucket, actual.get(bucket, (0,))[0])
+
+    # Relations
+
+    def relationship_aggregates(self):
+        """Agrégats par (type, tranche de idFilm) des deux côtés : {(type, tranche): (nombre, hachage)}."""
+        width = self.width("Film", "TFilm", "idFilm")
+        film, artist = sql_number("idFilm", PREFIXES["Film"]), sql_number("idArtist", PREFIXES["Artist"])
+        rows = self._sql(f"""
+            SELECT category, bucket, COUNT(*), SUM(h)
+            FROM (SELECT category, {film} / {width} AS bucket,
+                         ({sql_hash(artist)} * 31 + {sql_hash(film)}) % {MOD} AS h
+                  FROM tJob WHERE {and_where(ENDPOINTS, self.where["tJob"])}) t
+            GROUP BY category, bucket""")
+        expected = {}
+        for category, bucket, *values in rows:
+            if category is None:
+                # Crédits sans catégorie : aucun type de relation n'est créé
+                continue
+            # Plusieurs catégories peuvent donner le même type de relation
+            rel_type = category.replace(" ", "_").upper()
+            previous = expected.get((rel_type, bucket), (0, 0))
+            expected[(rel_type, bucket)] = tuple(a + b for a, b in zip(previous, _aggregates(values)))
+
+        film, artist = cypher_number("f.idFilm", PREFIXES["Film"]), cypher_number("a.idArtist", PREFIXES["Artist"])
+        records = self.data(f"""
+            MATCH (a:Artist)-[r]->(f:Film)
+            WITH type(r) AS type, {artist} AS ak, {film} AS fk, coalesce(r.count, 1) AS weight
+            WITH type, fk / $width AS bucket, ({cypher_hash("ak")} * 31 + {cypher_hash("fk")}) % {MOD} AS h, weight
+            RETURN type, bucket, sum(weight) AS rows, sum(h * weight) AS pair_hash""", width=width)
+        actual = {(record["type"], record["bucket"]): _aggregates((record["rows"], record["pair_hash"]))
+                  for record in records}
+        return expected, actual
+
+    def drill_relationships(self, rel_type, bucket, graph_rows):
+        """Couples (artiste, film) d'une tranche, comparés avec leur nombre de relations."""
+        width = self.widths["Film"]
+        condition, params = _bucket_condition(f"{sql_number('idFilm', PREFIXES['Film'])} / {width}", bucket)
+        category = f"UPPER(REPLACE(category, ' ', '_')) = {quote(rel_type)}"
+        rows = self._sql(f"SELECT idArtist, idFilm, COUNT(*) FROM tJob "
+                         f"WHERE {and_where(ENDPOINTS, self.where['tJob'], category, condition)} GROUP BY idArtist, idFilm",
+                         params)
+        expected = Counter({(row[0], row[1]): row[2] for row in rows})
+
+        returned = "RETURN a.idArtist AS artist, f.idFilm AS film, sum(coalesce(r.count, 1)) AS count"
+        films = sorted({row[1] for row in rows})
+        records = self.data(f"UNWIND $films AS key MATCH (a:Artist)-[r:`{rel_type}`]->(f:Film {{idFilm: key}}) {returned}",
+                            films=[self._graph_key("Film", film) for film in films])
+        if sum(record["count"] for record in records) < graph_rows:
+            # Relations vers des films absents de la tranche SQL : parcours du type limité à la tranche
+            records = self.data(f"MATCH (a:Artist)-[r:`{rel_type}`]->(f:Film) "
+                                f"WITH a, r, f, {cypher_number('f.idFilm', PREFIXES['Film'])} / $width AS bucket "
+                                f"WHERE bucket {'IS NULL' if bucket is None else '= $bucket'} {returned}",
+                                width=width, bucket=bucket)
+        actual = Counter({(imdb_id("Artist", record["artist"]), imdb_id("Film", record["film"])): record["count"]
+                          for record in records})
+
+        for (artist, film), count in (expected - actual).items():
+            self._difference("missing", rel_type, f"{artist}->{film}", f"{count} relationship(s)")
+        for (artist, film), count in (actual - expected).items():
+            self._difference("unexpected", rel_type, f"{artist}->{film}", f"{count} relationship(s)")
+
+    def check_relationships(self):
+        expected, actual = self.relationship_aggregates()
+        for rel_type, bucket in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1] is None, k[1] or 0)):
+            self.checked += 1
+            if expected.get((rel_type, bucket)) != actual.get((rel_type, bucket)):
+                self.mismatched.append((rel_type, bucket, expected.get((rel_type, bucket)), actual.get((rel_type, bucket))))
+                self.drill_relationships(rel_type, bucket, actual.get((rel_type, bucket), (0,))[0])
+
+    def orphan_jobs(self):
+        """Crédits SQL non attendus dans le graphe (artiste ou film inexistant)."""
+        self.cursor.execute(f"SELECT COUNT(*) FROM tJob WHERE {and_where(f'NOT ({ENDPOINTS})', self.where['tJob'])}")
+        return self.cursor.fetchone()[0]
+
+    def run(self):
+        """
+        Vérifie les nœuds puis les relations.
+
+        Returns:
+            bool: True si toutes les tranches concordent
+        """
+        for check in NODE_CHECKS:
+            self.check_nodes(*check)
+        self.check_relationships()
+        return not self.mismatched
+
+    def write_report(self, path):
+        """Écrit les différences détaillées en CSV (kind, what, key, detail)."""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, ["kind", "what", "key", "detail"])
+            writer.writeheader()
+            writer.writerows(self.differences)
+
+    def summary(self, limit=10):
+        lines = [f"{self.checked} buckets checked, {len(self.mismatched)} mismatched, "
+                 f"{len(self.differences)} differences found"]
+        for what, bucket, expected, actual in self.mismatched[:limit]:
+            lines.append(f"  {what} bucket {bucket}: expected {expected}, found {actual}")
+        for difference in self.differences[:limit]:
+            lines.append(f"  {difference['kind']} {difference['what']} {difference['key']} {difference['detail']}".rstrip())
+        return "\n".join(lines)